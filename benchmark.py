@@ -0,0 +1,169 @@
+"""
+Regression benchmark of the probability computation on real mid-game board states.
+
+The board states are stored in benchmarkdata/states.json and the reference results are
+stored in benchmarkdata/baseline.json.
+
+# Time the stored states and compare them with the baseline
+python benchmark.py run
+
+# Overwrite the baseline with the current results (--cpp also times the C++ implementation)
+python benchmark.py run --update-baseline --cpp
+
+# Compare the node counts of an ordering of the targets in the search with the baseline
+python benchmark.py run --ordering index
+
+The node counts do not depend on the machine, but the timings do,
+so the baseline must be updated on the machine used for the comparison.
+
+# Capture the most expensive states from real games
+python benchmark.py capture --diff hard --seeds 132 182 188 243 268 273 --top 2
+"""
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.constants import Difficulties
+from src.mine_sweeper import MineSweeper
+from src.player import Player
+from src.probability import ProbabilityCalculator
+
+
+STATES_PATH = "benchmarkdata/states.json"
+BASELINE_PATH = "benchmarkdata/baseline.json"
+# timing below this difference in seconds is considered as noise.
+TIME_TOLERANCE = 0.05
+
+
+class _RecordingPlayer(Player):
+    def __init__(self, field: MineSweeper):
+        super().__init__(field)
+        self.records: List[Dict[str, Any]] = []
+
+    def _open_by_proba(self) -> None:
+        cell_state, flags = self._field.cell_state, self.flags
+        n_nodes, elapsed = _run_python(cell_state, flags, self._field.neighbors, self._field.n_mines)
+        self.records.append(
+            dict(cell_state=cell_state.tolist(), flags=flags.astype(int).tolist(), n_nodes=n_nodes, elapsed=elapsed)
+        )
+        super()._open_by_proba()
+
+
+def _run_python(
+    cell_state: np.ndarray, flags: np.ndarray, neighbors: List[np.ndarray], n_mines: int, ordering: str = "constrained"
+) -> tuple:
+    prob = ProbabilityCalculator(
+        cell_state=cell_state, flags=flags, neighbors=neighbors, n_mines=n_mines, ordering=ordering
+    )
+    s = time.time()
+    prob.compute()
+    return prob.stats.n_nodes, time.time() - s
+
+
+def _run_cpp(cell_state: np.ndarray, field: MineSweeper, ordering: str = "constrained") -> Optional[float]:
+    try:
+        import mine_sweeper_solver
+    except ImportError:
+        return None
+
+    s = time.time()
+    mine_sweeper_solver.calculate_probability(
+        cell_state.reshape(field.height, field.width), field.n_mines, ordering=ordering
+    )
+    return time.time() - s
+
+
+def capture(difficulty: int, seeds: List[int], top: int) -> None:
+    states = []
+    if os.path.exists(STATES_PATH):
+        with open(STATES_PATH, "r") as f:
+            states = json.load(f)
+
+    for seed in seeds:
+        player = _RecordingPlayer(MineSweeper(difficulty, seed=seed, plot_field=False))
+        player.solve()
+        records = sorted(player.records, key=lambda r: r["n_nodes"], reverse=True)[:top]
+        for rank, r in enumerate(records):
+            name = f"{Difficulties(difficulty).name}-seed{seed}-top{rank}"
+            print(f"{name}: {r['n_nodes']} nodes in {r['elapsed']:.3f} s")
+            states = [s for s in states if s["name"] != name]
+            states.append(dict(name=name, difficulty=difficulty, cell_state=r["cell_state"], flags=r["flags"]))
+
+    os.makedirs(os.path.dirname(STATES_PATH), exist_ok=True)
+    with open(STATES_PATH, "w") as f:
+        json.dump(states, f)
+
+
+def run(threshold: float, update_baseline: bool, cpp: bool, n_repeats: int, ordering: str) -> bool:
+    with open(STATES_PATH, "r") as f:
+        states = json.load(f)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH) and not update_baseline:
+        with open(BASELINE_PATH, "r") as f:
+            baseline = json.load(f)
+
+    results, regressions = {}, []
+    for state in states:
+        field = MineSweeper(state["difficulty"], plot_field=False)
+        cell_state = np.asarray(state["cell_state"], dtype=np.int32)
+        flags = np.asarray(state["flags"], dtype=np.bool8)
+        # the fastest run is the least affected by the other processes.
+        runs = [_run_python(cell_state, flags, field.neighbors, field.n_mines, ordering) for _ in range(n_repeats)]
+        result = dict(python_nodes=runs[0][0], python_time=min(elapsed for _, elapsed in runs))
+        if cpp:
+            cpp_times = [_run_cpp(cell_state, field, ordering) for _ in range(n_repeats)]
+            result.update(cpp_time=None if cpp_times[0] is None else min(cpp_times))
+
+        results[state["name"]] = result
+        for key, val in result.items():
+            ref = baseline.get(state["name"], {}).get(key)
+            if val is None or ref is None:
+                continue
+            tolerance = TIME_TOLERANCE if key.endswith("_time") else 0
+            if val > ref * (1 + threshold) and val - ref > tolerance:
+                regressions.append(f"{state['name']} {key}: {ref} --> {val}")
+
+        stats = [f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()]
+        print(", ".join([state["name"]] + stats))
+
+    if update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=4)
+
+    for regression in regressions:
+        print(f"Regression: {regression}")
+
+    return len(regressions) == 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    capture_parser = subparsers.add_parser("capture")
+    capture_parser.add_argument("--diff", default="hard", choices=[d.name for d in Difficulties])
+    capture_parser.add_argument("--seeds", type=int, nargs="+", required=True)
+    capture_parser.add_argument("--top", type=int, default=2)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+    run_parser.add_argument("--update-baseline", action="store_true")
+    run_parser.add_argument("--cpp", action="store_true")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--ordering", default="constrained", choices=["index", "frontier", "constrained"])
+
+    args = parser.parse_args()
+    if args.command == "capture":
+        capture(difficulty=getattr(Difficulties, args.diff).value, seeds=args.seeds, top=args.top)
+    elif not run(
+        threshold=args.threshold,
+        update_baseline=args.update_baseline,
+        cpp=args.cpp,
+        n_repeats=args.repeat,
+        ordering=args.ordering,
+    ):
+        sys.exit(1)
@@ -1,3 +1,6 @@
+#include <algorithm>
+#include <cmath>
+#include <cstddef>
 #include <vector>
 
 using std::pair;
@@ -10,53 +13,118 @@ struct AssumptionDefinition {
 };
 
 const AssumptionDefinition assumption_definition = AssumptionDefinition();
+
+struct TargetOrdering {
+  const int index = 0;
+  const int frontier = 1;
+  const int constrained = 2;
+};
+
+const TargetOrdering target_ordering = TargetOrdering();
 const int closed_cell_state = -1;
 
-vector<vector<long double>> compute_combination(int n) {
-  vector<vector<long double>> combination_memo =
-      vector<vector<long double>>(n, vector<long double>(n, 0.0));
-  for (int i = 0; i < n; ++i) {
-    combination_memo[i][0] = 1.0;
-    for (int j = 1; j <= i; ++j)
-      combination_memo[i][j] = combination_memo[i][j - 1] / j * (i + 1 - j);
+// a 2D view of a buffer owned by the caller, e.g. a NumPy array, so that the
+// cells are read in place. The strides are in elements.
+template <typename T> struct GridView {
+  T *data;
+  int height;
+  int width;
+  std::ptrdiff_t row_stride;
+  std::ptrdiff_t col_stride;
+
+  T &operator()(int h, int w) const {
+    return data[h * row_stride + w * col_stride];
+  }
+};
+
+vector<long double> compute_log_factorial(int n) {
+  // the binomials are computed in the log space, so that they never overflow
+  // and the memory is linear in the field size.
+  vector<long double> log_factorial = vector<long double>(n, 0.0);
+  for (int i = 1; i < n; ++i)
+    log_factorial[i] = log_factorial[i - 1] + std::log((long double)i);
+  return log_factorial;
+}
+
+vector<long double> convolve(const vector<long double> &a,
+                             const vector<long double> &b) {
+  vector<long double> c = vector<long double>(a.size() + b.size() - 1, 0.0);
+  for (int i = 0; i < (int)a.size(); ++i) {
+    for (int j = 0; j < (int)b.size(); ++j)
+      c[i + j] += a[i] * b[j];
   }
-  return combination_memo;
+  return c;
 }
 
 struct MineSweeperSolver {
   // constant variables.
-  const vector<vector<int>> cell_states;
+  const GridView<const int> cell_states;
   const int n_total_bombs;
+  const int ordering;
   const int height;
   const int width;
   vector<vector<vector<pair<int, int>>>> neighbor_list;
   int n_hard_cells;
   int n_initial_bombs;
   int n_targets;
-  vector<vector<long double>> combination_memo;
+  vector<long double> log_factorial;
+  long double log_scale;
   vector<pair<int, int>> target_cell_positions;
 
   // state variables.
   vector<vector<int>> cell_definitions;
 
+  // the constraints given by the opened cells around the targets.
+  vector<vector<int>> target_constraints;
+  vector<vector<int>> constraint_targets;
+  vector<int> constraint_needs;
+
+  // search state variables, which are updated on each assignment.
+  vector<int> constraint_n_bombs;
+  vector<int> constraint_n_undecided;
+  vector<int> assigned_bombs;
+
+  // the histogram of the component being enumerated.
+  vector<long double> n_configs;
+  vector<vector<long double>> bomb_counts;
+
   // variables for the result.
-  vector<long double> probs;
-  long double prob_sum;
+  vector<long double> target_probs;
+  long double hard_prob;
 
-  MineSweeperSolver(vector<vector<int>> &cell_states, int n_total_bombs)
+  MineSweeperSolver(const GridView<const int> &cell_states, int n_total_bombs,
+                    int ordering)
       : cell_states(cell_states), n_total_bombs(n_total_bombs),
-        height(cell_states.size()), width(cell_states[0].size()) {
+        ordering(ordering), height(cell_states.height),
+        width(cell_states.width) {
     neighbor_list = get_neighbor_list();
     cell_definitions = vector<vector<int>>(height, vector<int>(width, -1));
     determine_bomb_cells();
     determine_safe_cells();
+    presolve();
     target_cell_positions = collect_target_cell_positions();
     n_targets = target_cell_positions.size();
-    combination_memo = compute_combination(width * height + 1);
-    probs = vector<long double>(target_cell_positions.size() + 1, 0.0);
+    log_factorial = compute_log_factorial(width * height + 1);
+    target_probs = vector<long double>(n_targets, 0.0);
     n_hard_cells = count_hard_cells();
     n_initial_bombs = count_bombs();
-    prob_sum = 0.0;
+    log_scale = compute_log_scale();
+    hard_prob = 0.0;
+    collect_constraints();
+  }
+
+  long double log_combination(int n, int k) {
+    return log_factorial[n] - log_factorial[k] - log_factorial[n - k];
+  }
+
+  long double compute_log_scale() {
+    // all the weights are divided by the largest binomial among the possible
+    // numbers of bombs in the hard cells, so that they stay in the range.
+    int lo = std::max(0, n_total_bombs - n_initial_bombs - n_targets);
+    int hi = std::min(n_hard_cells, n_total_bombs - n_initial_bombs);
+    if (lo > hi)
+      return 0.0;
+    return log_combination(n_hard_cells, std::clamp(n_hard_cells / 2, lo, hi));
   }
 
   bool is_safe(int h, int w) {
@@ -68,7 +136,7 @@ struct MineSweeperSolver {
   }
 
   bool is_closed(int h, int w) {
-    return cell_states[h][w] == closed_cell_state;
+    return cell_states(h, w) == closed_cell_state;
   }
 
   int count_close_around(vector<pair<int, int>> &neighbor_positions) {
@@ -94,15 +162,6 @@ struct MineSweeperSolver {
     return count;
   }
 
-  int count_safe_around(vector<pair<int, int>> &neighbor_positions) {
-    int count = 0;
-    for (const auto &[y, x] : neighbor_positions) {
-      if (is_safe(y, x))
-        ++count;
-    }
-    return count;
-  }
-
   int count_bombs() {
     int count = 0;
     for (int h = 0; h < height; ++h) {
@@ -132,8 +191,8 @@ struct MineSweeperSolver {
   void determine_bomb_cells() {
     for (int h = 0; h < height; ++h) {
       for (int w = 0; w < width; ++w) {
-        const int n_bombs_around = cell_states[h][w];
-        if (is_closed(h, w) || cell_states[h][w] == 0)
+        const int n_bombs_around = cell_states(h, w);
+        if (is_closed(h, w) || cell_states(h, w) == 0)
           continue;
         vector<pair<int, int>> &neighbor_positions = neighbor_list[h][w];
         int close_count = count_close_around(neighbor_positions);
@@ -150,7 +209,7 @@ struct MineSweeperSolver {
   void determine_safe_cells() {
     for (int h = 0; h < height; ++h) {
       for (int w = 0; w < width; ++w) {
-        const int n_bombs_around = cell_states[h][w];
+        const int n_bombs_around = cell_states(h, w);
         if (is_closed(h, w))
           continue;
         vector<pair<int, int>> &neighbor_positions = neighbor_list[h][w];
@@ -167,6 +226,103 @@ struct MineSweeperSolver {
     }
   }
 
+  bool is_constraint(int h, int w) {
+    return !is_closed(h, w) && cell_states(h, w) > 0;
+  }
+
+  vector<pair<int, int>> get_undefined_around(int h, int w) {
+    vector<pair<int, int>> undefined_positions = vector<pair<int, int>>();
+    for (const auto &[y, x] : neighbor_list[h][w]) {
+      if (is_closed(y, x) &&
+          cell_definitions[y][x] == assumption_definition.undefined)
+        undefined_positions.push_back(std::make_pair(y, x));
+    }
+    return undefined_positions;
+  }
+
+  bool define_cells(vector<pair<int, int>> &positions, int definition) {
+    for (const auto &[y, x] : positions)
+      cell_definitions[y][x] = definition;
+    return !positions.empty();
+  }
+
+  bool apply_single_rule(int h, int w) {
+    vector<pair<int, int>> positions = get_undefined_around(h, w);
+    int need = cell_states(h, w) - count_bomb_around(neighbor_list[h][w]);
+    if (need == 0)
+      return define_cells(positions, assumption_definition.safe);
+    if (need == (int)positions.size())
+      return define_cells(positions, assumption_definition.bomb);
+    return false;
+  }
+
+  bool apply_pair_rule(int ah, int aw, int bh, int bw) {
+    vector<pair<int, int>> positions_a = get_undefined_around(ah, aw);
+    vector<pair<int, int>> positions_b = get_undefined_around(bh, bw);
+    vector<pair<int, int>> only_a, only_b, shared;
+    for (const auto &p : positions_a) {
+      if (std::find(positions_b.begin(), positions_b.end(), p) ==
+          positions_b.end())
+        only_a.push_back(p);
+      else
+        shared.push_back(p);
+    }
+    for (const auto &p : positions_b) {
+      if (std::find(positions_a.begin(), positions_a.end(), p) ==
+          positions_a.end())
+        only_b.push_back(p);
+    }
+    if (shared.empty())
+      return false;
+
+    int need_a = cell_states(ah, aw) - count_bomb_around(neighbor_list[ah][aw]);
+    int need_b = cell_states(bh, bw) - count_bomb_around(neighbor_list[bh][bw]);
+    int n_only_a = only_a.size(), n_only_b = only_b.size();
+    int n_shared = shared.size();
+    // the range of the number of bombs in the shared cells.
+    int lo = std::max({0, need_a - n_only_a, need_b - n_only_b});
+    int hi = std::min({need_a, need_b, n_shared});
+    if (lo > hi) // contradiction, which is left to the search.
+      return false;
+
+    bool changed = false;
+    if (lo == n_shared)
+      changed |= define_cells(shared, assumption_definition.bomb);
+    else if (hi == 0)
+      changed |= define_cells(shared, assumption_definition.safe);
+    if (need_a - hi == n_only_a)
+      changed |= define_cells(only_a, assumption_definition.bomb);
+    else if (need_a - lo == 0)
+      changed |= define_cells(only_a, assumption_definition.safe);
+    if (need_b - hi == n_only_b)
+      changed |= define_cells(only_b, assumption_definition.bomb);
+    else if (need_b - lo == 0)
+      changed |= define_cells(only_b, assumption_definition.safe);
+    return changed;
+  }
+
+  void presolve() {
+    // apply each number and each pair of numbers within two cells
+    // until nothing changes, which shrinks the targets of the search.
+    bool changed = true;
+    while (changed) {
+      changed = false;
+      for (int h = 0; h < height; ++h) {
+        for (int w = 0; w < width; ++w) {
+          if (!is_constraint(h, w))
+            continue;
+          changed |= apply_single_rule(h, w);
+          for (int y = std::max(0, h - 2); y <= std::min(height - 1, h + 2); ++y) {
+            for (int x = std::max(0, w - 2); x <= std::min(width - 1, w + 2); ++x) {
+              if ((y != h || x != w) && is_constraint(y, x))
+                changed |= apply_pair_rule(h, w, y, x);
+            }
+          }
+        }
+      }
+    }
+  }
+
   vector<vector<vector<pair<int, int>>>> get_neighbor_list() {
     vector<vector<vector<pair<int, int>>>> neighbor_list =
         vector<vector<vector<pair<int, int>>>>(
@@ -205,96 +361,269 @@ struct MineSweeperSolver {
     return target_cell_positions;
   }
 
-  bool is_assumption_valid(int h, int w, int n_defined_bombs,
-                           int n_undefined_cells) {
-    if (n_hard_cells + n_undefined_cells < n_total_bombs - n_defined_bombs ||
-        n_defined_bombs > n_total_bombs)
-      return false;
+  void collect_constraints() {
+    vector<vector<int>> target_indices =
+        vector<vector<int>>(height, vector<int>(width, -1));
+    for (int i = 0; i < n_targets; ++i) {
+      const auto &[h, w] = target_cell_positions[i];
+      target_indices[h][w] = i;
+    }
+    target_constraints = vector<vector<int>>(n_targets, vector<int>());
+    for (int h = 0; h < height; ++h) {
+      for (int w = 0; w < width; ++w) {
+        if (!is_constraint(h, w))
+          continue;
+        vector<int> targets = vector<int>();
+        for (const auto &[y, x] : neighbor_list[h][w]) {
+          if (target_indices[y][x] >= 0)
+            targets.push_back(target_indices[y][x]);
+        }
+        if (targets.empty())
+          continue;
+        for (int t : targets)
+          target_constraints[t].push_back(constraint_targets.size());
+        constraint_targets.push_back(targets);
+        constraint_needs.push_back(cell_states(h, w) -
+                                   count_bomb_around(neighbor_list[h][w]));
+        constraint_n_bombs.push_back(0);
+        constraint_n_undecided.push_back(targets.size());
+      }
+    }
+  }
 
-    for (const auto &[y, x] : neighbor_list[h][w]) {
-      if (is_closed(y, x))
+  vector<vector<int>> split_components() {
+    // targets are connected if they share a constraint.
+    vector<int> labels = vector<int>(n_targets, -1);
+    vector<vector<int>> components = vector<vector<int>>();
+    for (int start = 0; start < n_targets; ++start) {
+      if (labels[start] != -1)
         continue;
-      vector<pair<int, int>> &neighbor_positions = neighbor_list[y][x];
-      int n_neighbors = neighbor_positions.size();
-      int true_n_bombs_around = cell_states[y][x];
-      int n_bombs_around = count_bomb_around(neighbor_positions);
-      int n_safe_around = count_safe_around(neighbor_positions);
-      if (n_bombs_around > true_n_bombs_around ||
-          n_neighbors - n_safe_around < true_n_bombs_around)
-        return false;
+      labels[start] = components.size();
+      vector<int> members = vector<int>(1, start);
+      for (int i = 0; i < (int)members.size(); ++i) {
+        for (int c : target_constraints[members[i]]) {
+          for (int t : constraint_targets[c]) {
+            if (labels[t] != -1)
+              continue;
+            labels[t] = components.size();
+            members.push_back(t);
+          }
+        }
+      }
+      components.push_back(order_members(members));
     }
-    return true;
+    return components;
   }
 
-  void compute_prob(int n_defined_bombs) {
-    // n_hard_cells >= n_total_bombs - n_defined_bombs
-    long double prob =
-        combination_memo[n_hard_cells][n_total_bombs - n_defined_bombs];
-    for (int i = 0; i < n_targets; ++i) {
-      const auto &[h, w] = target_cell_positions[i];
-      if (is_bomb(h, w))
-        probs[i] += prob;
+  vector<int> order_members(vector<int> &members) {
+    // the members are given in the breadth-first order over the constraints.
+    if (ordering == target_ordering.index) {
+      std::sort(members.begin(), members.end());
+      return members;
+    }
+    if (ordering == target_ordering.frontier)
+      return members;
+
+    // the target in the constraint closest to be closed goes first, so that
+    // the contradictions are found near the root. ties prefer the targets in
+    // more constraints.
+    vector<int> n_unordered = vector<int>(constraint_targets.size(), 0);
+    for (int t : members) {
+      for (int c : target_constraints[t])
+        n_unordered[c] = constraint_targets[c].size();
     }
-    if (n_hard_cells >= 1 && n_total_bombs - n_defined_bombs > 0) {
-      // Probability for hard cells.
-      probs[n_targets] += combination_memo[n_hard_cells - 1]
-                                          [n_total_bombs - n_defined_bombs - 1];
+    vector<int> unordered = members;
+    std::sort(unordered.begin(), unordered.end());
+    vector<int> ordered = vector<int>();
+    while (!unordered.empty()) {
+      int best = 0, best_n_unordered = 0, best_n_constraints = 0;
+      for (int i = 0; i < (int)unordered.size(); ++i) {
+        const vector<int> &constraints = target_constraints[unordered[i]];
+        int min_n_unordered =
+            constraints.empty() ? 0 : n_unordered[constraints[0]];
+        for (int c : constraints)
+          min_n_unordered = std::min(min_n_unordered, n_unordered[c]);
+        int n_constraints = constraints.size();
+        if (i == 0 || min_n_unordered < best_n_unordered ||
+            (min_n_unordered == best_n_unordered &&
+             n_constraints > best_n_constraints)) {
+          best = i;
+          best_n_unordered = min_n_unordered;
+          best_n_constraints = n_constraints;
+        }
+      }
+      ordered.push_back(unordered[best]);
+      for (int c : target_constraints[unordered[best]])
+        --n_unordered[c];
+      unordered.erase(unordered.begin() + best);
     }
-    prob_sum += prob;
+    return ordered;
   }
 
-  void depth_first_search(int target_index, int n_defined_bombs) {
-    if (n_targets == target_index) {
-      compute_prob(n_defined_bombs);
-      return;
+  bool assign(int target, int depth, bool bomb) {
+    // the counters of the constraints around the target are updated in O(1).
+    bool valid = true;
+    for (int c : target_constraints[target]) {
+      --constraint_n_undecided[c];
+      constraint_n_bombs[c] += bomb;
+      if (constraint_n_bombs[c] > constraint_needs[c] ||
+          constraint_n_bombs[c] + constraint_n_undecided[c] <
+              constraint_needs[c])
+        valid = false;
     }
-    const auto &[h, w] = target_cell_positions[target_index];
-    cell_definitions[h][w] = assumption_definition.bomb;
-    int n_undefined_cells = n_targets - target_index - 1;
-    if (is_assumption_valid(h, w, n_defined_bombs + 1, n_undefined_cells))
-      depth_first_search(target_index + 1, n_defined_bombs + 1);
+    if (bomb)
+      assigned_bombs.push_back(depth);
+    return valid && (int)assigned_bombs.size() <= n_total_bombs - n_initial_bombs;
+  }
 
-    cell_definitions[h][w] = assumption_definition.safe;
-    if (is_assumption_valid(h, w, n_defined_bombs, n_undefined_cells))
-      depth_first_search(target_index + 1, n_defined_bombs);
+  void unassign(int target, bool bomb) {
+    for (int c : target_constraints[target]) {
+      ++constraint_n_undecided[c];
+      constraint_n_bombs[c] -= bomb;
+    }
+    if (bomb)
+      assigned_bombs.pop_back();
+  }
 
-    cell_definitions[h][w] = assumption_definition.undefined;
+  void depth_first_search(const vector<int> &members, int depth) {
+    if ((int)members.size() == depth) {
+      // only the assigned bombs are added instead of scanning all the targets.
+      int n_bombs = assigned_bombs.size();
+      n_configs[n_bombs] += 1.0;
+      for (int i : assigned_bombs)
+        bomb_counts[n_bombs][i] += 1.0;
+      return;
+    }
+    int target = members[depth];
+    if (assign(target, depth, true))
+      depth_first_search(members, depth + 1);
+    unassign(target, true);
+    if (assign(target, depth, false))
+      depth_first_search(members, depth + 1);
+    unassign(target, false);
   }
 
-  vector<vector<long double>> get_probs() {
-    vector<vector<long double>> prob_in_cells =
-        vector<vector<long double>>(height, vector<long double>(width, -1.0));
-    for (auto &p : probs)
-      p /= prob_sum;
-    for (int i = 0; i < n_targets; ++i) {
-      const auto &[y, x] = target_cell_positions[i];
-      prob_in_cells[y][x] = probs[i];
+  long double hard_weight(int n_target_bombs) {
+    // the number of ways to put the other bombs in the hard cells.
+    int n_hard_bombs = n_total_bombs - n_initial_bombs - n_target_bombs;
+    if (n_hard_bombs < 0 || n_hard_bombs > n_hard_cells)
+      return 0.0;
+    return std::exp(log_combination(n_hard_cells, n_hard_bombs) - log_scale);
+  }
+
+  void combine(const vector<vector<int>> &components,
+               const vector<vector<long double>> &histograms,
+               const vector<vector<vector<long double>>> &counts) {
+    // convolve the histograms of the other components to weight each number
+    // of bombs in a component.
+    int n_components = components.size();
+    vector<vector<long double>> prefix(n_components + 1, vector<long double>(1, 1.0));
+    vector<vector<long double>> suffix(n_components + 1, vector<long double>(1, 1.0));
+    for (int i = 0; i < n_components; ++i) {
+      prefix[i + 1] = convolve(prefix[i], histograms[i]);
+      suffix[n_components - i - 1] =
+          convolve(suffix[n_components - i], histograms[n_components - i - 1]);
+    }
+    long double total = 0.0, hard_total = 0.0;
+    const vector<long double> &total_configs = prefix[n_components];
+    for (int k = 0; k < (int)total_configs.size(); ++k) {
+      long double weight = total_configs[k] * hard_weight(k);
+      total += weight;
+      // C(n - 1, m - 1) = C(n, m) * m / n for a given hard cell.
+      if (n_hard_cells > 0)
+        hard_total +=
+            weight * (n_total_bombs - n_initial_bombs - k) / n_hard_cells;
     }
+    if (total == 0.0) { // contradiction
+      hard_prob = 1.0;
+      return;
+    }
+    hard_prob = hard_total / total;
+
+    for (int c = 0; c < n_components; ++c) {
+      vector<long double> others = convolve(prefix[c], suffix[c + 1]);
+      const vector<int> &members = components[c];
+      long double component_total = 0.0;
+      vector<long double> weighted = vector<long double>(members.size(), 0.0);
+      for (int k = 0; k < (int)histograms[c].size(); ++k) {
+        long double weight = 0.0;
+        for (int j = 0; j < (int)others.size(); ++j)
+          weight += others[j] * hard_weight(k + j);
+        component_total += histograms[c][k] * weight;
+        for (int i = 0; i < (int)members.size(); ++i)
+          weighted[i] += counts[c][k][i] * weight;
+      }
+      for (int i = 0; i < (int)members.size(); ++i)
+        target_probs[members[i]] = weighted[i] / component_total;
+    }
+  }
+
+  void write_probs(const GridView<double> &probs) {
     for (int h = 0; h < height; ++h) {
       for (int w = 0; w < width; ++w) {
-        if (prob_in_cells[h][w] >= 0)
-          continue;
         if (is_safe(h, w)) {
-          prob_in_cells[h][w] = 0.0;
+          probs(h, w) = 0.0;
         } else if (is_bomb(h, w)) {
-          prob_in_cells[h][w] = 1.0;
+          probs(h, w) = 1.0;
         } else {
-          // hard cell.
-          prob_in_cells[h][w] = probs[n_targets];
+          // hard cell, unless it is a target below.
+          probs(h, w) = (double)hard_prob;
         }
       }
     }
-    return prob_in_cells;
+    for (int i = 0; i < n_targets; ++i) {
+      const auto &[y, x] = target_cell_positions[i];
+      probs(y, x) = (double)target_probs[i];
+    }
   }
 
-  vector<vector<long double>> solve() {
-    depth_first_search(0, n_initial_bombs);
-    return get_probs();
+  void solve() {
+    // each component is enumerated on its own into a histogram of the number
+    // of bombs and the counts of bombs in each cell per number of bombs.
+    vector<vector<int>> components = split_components();
+    vector<vector<long double>> histograms;
+    vector<vector<vector<long double>>> counts;
+    for (const auto &members : components) {
+      int n_members = members.size();
+      n_configs = vector<long double>(n_members + 1, 0.0);
+      bomb_counts = vector<vector<long double>>(
+          n_members + 1, vector<long double>(n_members, 0.0));
+      depth_first_search(members, 0);
+      histograms.push_back(n_configs);
+      counts.push_back(bomb_counts);
+    }
+    combine(components, histograms, counts);
   }
 };
 
-vector<vector<long double>> calculate_prob(vector<vector<int>> &cell_states,
-                                           int n_total_bombs) {
-  MineSweeperSolver solver = MineSweeperSolver(cell_states, n_total_bombs);
-  return solver.solve();
+void calculate_prob(const GridView<const int> &cell_states, int n_total_bombs,
+                    const GridView<double> &probs,
+                    int ordering = target_ordering.constrained) {
+  // the probabilities are written into probs, which has the shape of
+  // cell_states.
+  MineSweeperSolver solver =
+      MineSweeperSolver(cell_states, n_total_bombs, ordering);
+  solver.solve();
+  solver.write_probs(probs);
+}
+
+vector<vector<long double>>
+calculate_prob(vector<vector<int>> &cell_states, int n_total_bombs,
+               int ordering = target_ordering.constrained) {
+  const int height = cell_states.size(), width = cell_states[0].size();
+  vector<int> states = vector<int>();
+  for (const auto &row : cell_states)
+    states.insert(states.end(), row.begin(), row.end());
+  vector<double> probs = vector<double>(height * width);
+  calculate_prob(GridView<const int>{states.data(), height, width, width, 1},
+                 n_total_bombs,
+                 GridView<double>{probs.data(), height, width, width, 1},
+                 ordering);
+  vector<vector<long double>> prob_in_cells =
+      vector<vector<long double>>(height, vector<long double>(width));
+  for (int h = 0; h < height; ++h) {
+    for (int w = 0; w < width; ++w)
+      prob_in_cells[h][w] = probs[h * width + w];
+  }
+  return prob_in_cells;
 }
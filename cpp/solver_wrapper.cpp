@@ -1,9 +1,51 @@
-#include <vector>
+#include <stdexcept>
+#include <string>
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
-#include <pybind11/stl.h>
 #include "solver.cpp"
 
+namespace py = pybind11;
+
+py::array_t<double>
+calculate_prob_array(py::array_t<int, py::array::forcecast> cell_states,
+                     int n_total_bombs, const std::string &ordering) {
+  if (cell_states.ndim() != 2)
+    throw std::invalid_argument("cell_states must be a 2D array");
+
+  int ordering_id;
+  if (ordering == "index")
+    ordering_id = target_ordering.index;
+  else if (ordering == "frontier")
+    ordering_id = target_ordering.frontier;
+  else if (ordering == "constrained")
+    ordering_id = target_ordering.constrained;
+  else
+    throw std::invalid_argument(
+        "ordering must be one of index, frontier and constrained, but got " +
+        ordering);
+
+  const int height = cell_states.shape(0), width = cell_states.shape(1);
+  py::array_t<double> prob_in_cells({height, width});
+  // the solver reads the input and writes the output in place through the
+  // strides of the arrays, so that no cell is copied on the way.
+  const GridView<const int> states = {
+      cell_states.data(), height, width,
+      cell_states.strides(0) / (std::ptrdiff_t)sizeof(int),
+      cell_states.strides(1) / (std::ptrdiff_t)sizeof(int)};
+  const GridView<double> probs = {prob_in_cells.mutable_data(), height, width,
+                                  width, 1};
+  {
+    // the buffers are owned by the arrays above, so the search does not need
+    // the GIL and the other Python threads can run their own searches.
+    py::gil_scoped_release release;
+    calculate_prob(states, n_total_bombs, probs, ordering_id);
+  }
+  return prob_in_cells;
+}
 
 PYBIND11_MODULE(mine_sweeper_solver, m) {
-  m.def("calculate_probability", &calculate_prob, "A function to calculate probabilities for the Minesweeper game");
+  m.def("calculate_probability", &calculate_prob_array,
+        "A function to calculate probabilities for the Minesweeper game",
+        py::arg("cell_states"), py::arg("n_total_bombs"),
+        py::arg("ordering") = "constrained");
 }
@@ -0,0 +1,87 @@
+"""
+Local service of the probability computation, which keeps the solver warm between the requests.
+
+Each request is one JSON line and gets one JSON line in response, e.g.
+{"id": 0, "cell_state": [[-1, 1, 0], [-1, 1, 0], [-1, 1, 0]], "n_mines": 1}
+{"id": 0, "index": [0, 3, 6], "proba": [0.0, 1.0, 0.0], "p_land": 1.0, "elapsed": 0.0001}
+The responses may come out of order, so the requests should have ids.
+stdin may also be a file of the requests, which are answered until its end.
+
+# Serve over stdin and stdout
+python serve.py
+
+# Answer a file of requests
+python serve.py < requests.jsonl > responses.jsonl
+
+# Serve over a Unix socket with 4 worker processes
+python serve.py --socket /tmp/mine_sweeper.sock --jobs 4
+"""
+import asyncio
+import os
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+from src.engine import ENGINES
+from src.service import STREAM_LIMIT, init_worker, serve_stream
+
+
+class _StdoutWriter:
+    # stdout written as asyncio.StreamWriter, which is enough for the short responses.
+    def write(self, data: bytes) -> None:
+        sys.stdout.buffer.write(data)
+
+    async def drain(self) -> None:
+        sys.stdout.buffer.flush()
+
+
+def _feed_stdin(loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader) -> None:
+    # stdin read by a thread into the reader of the event loop.
+    for chunk in iter(lambda: os.read(sys.stdin.fileno(), 2**16), b""):
+        loop.call_soon_threadsafe(reader.feed_data, chunk)
+    loop.call_soon_threadsafe(reader.feed_eof)
+
+
+async def serve(socket: str, n_jobs: int, engine: str, max_batch: int) -> None:
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(n_jobs, initializer=init_worker, initargs=(engine,)) as executor:
+        if socket is None:
+            reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+            try:
+                await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+            except ValueError:
+                # a regular file, e.g. python serve.py < requests.jsonl, is not a pipe, so that it is read by a thread.
+                feeding = loop.run_in_executor(None, _feed_stdin, loop, reader)
+            else:
+                feeding = None
+
+            await serve_stream(reader, _StdoutWriter(), executor, n_workers=n_jobs, max_batch=max_batch)
+            if feeding is not None:
+                await feeding
+            return
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                await serve_stream(reader, writer, executor, n_workers=n_jobs, max_batch=max_batch)
+            finally:
+                writer.close()
+
+        if os.path.exists(socket):
+            os.remove(socket)
+        server = await asyncio.start_unix_server(handle, path=socket, limit=STREAM_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    # the requests are read from stdin if no socket is given.
+    parser.add_argument("--socket", type=str, default=None)
+    parser.add_argument("--jobs", type=int, default=1)
+    # auto chooses the engine of each request by the size of the frontier (cpp is listed only if it is built).
+    parser.add_argument("--engine", default="auto", choices=list(ENGINES))
+    # the maximum number of the waiting requests taken at once.
+    parser.add_argument("--max-batch", type=int, default=64)
+
+    args = parser.parse_args()
+    asyncio.run(serve(socket=args.socket, n_jobs=args.jobs, engine=args.engine, max_batch=args.max_batch))
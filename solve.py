@@ -1,26 +1,241 @@
+import json
+import os
+import signal
 import time
 from argparse import ArgumentParser
+from functools import partial
+from multiprocessing import Pool
+from types import FrameType
+from typing import IO, Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
-from src.constants import Difficulties
+from src.batch import BatchMineSweeper, BatchPlayer
+from src.constants import Difficulties, SearchStats
+from src.engine import ENGINES
 from src.mine_sweeper import MineSweeper
 from src.player import Player
-from src.player_cpp import PlayerCpp
+from src.trace import TraceRecorder
+from src.transposition import TranspositionCache
 
 
-def solve(seed: int, n_games: int, difficulty: int, cpp: bool) -> None:
+# the enumeration results are shared by all the games played in each process.
+CACHE = TranspositionCache()
+
+
+class GameResult(NamedTuple):
+    """
+    Attributes:
+        seed (int):
+            The seed of the game.
+        result (str):
+            "win", "lose" or "timeout".
+        moves (int):
+            The number of moves that opened cells.
+        guesses (int):
+            The number of moves that opened cells with the risk of a mine.
+        solver_time (float):
+            The total time of the probability computations in seconds.
+        slowest_guess (float):
+            The time of the slowest probability computation in seconds.
+        elapsed (float):
+            The wall time of the game in seconds.
+    """
+
+    seed: int
+    result: str
+    moves: int
+    guesses: int
+    solver_time: float
+    slowest_guess: float
+    elapsed: float
+
+
+class GameTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum: int, frame: Optional[FrameType]) -> None:
+    raise GameTimeout
+
+
+def _solver_times(stats: List[SearchStats]) -> Tuple[float, float]:
+    elapsed = [s.elapsed for s in stats]
+    return float(sum(elapsed)), max(elapsed, default=0.0)
+
+
+def play(
+    seed: int,
+    difficulty: int,
+    engine: str,
+    plot_field: bool = True,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    shape: Optional[Tuple[int, int, int]] = None,
+    trace: Optional[str] = None,
+    game_timeout: Optional[float] = None,
+) -> GameResult:
     s = time.time()
-    n_win, start = 0, seed
+    field = MineSweeper(difficulty, seed=seed, plot_field=plot_field, shape=shape)
+    kwargs: Dict[str, Any] = dict(
+        max_nodes=max_nodes, timeout=timeout, sampling_timeout=timeout, cache=CACHE, engine=engine
+    )
+    # each game is appended to the trace by one write, so that the processes can share the file.
+    recorder = None if trace is None else TraceRecorder(trace)
+    player = Player(field, recorder=recorder, **kwargs)
+    try:
+        if game_timeout is not None:
+            # the alarm interrupts the game at the next Python bytecode, i.e. after the C++ solver returns.
+            signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, game_timeout)
 
-    player_cls = PlayerCpp if cpp else Player
-    for n in range(start, start + n_games):
-        field = MineSweeper(difficulty, seed=n)
-        n_win += player_cls(field).solve()
-        print(f"{n + 1 - start}: winning {n_win}\n")
+        result = "win" if player.solve() else "lose"
+    except GameTimeout:
+        # the timed out games are not written to the trace.
+        result = "timeout"
+    finally:
+        if game_timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0.0)
+        if recorder is not None:
+            recorder.close()
+
+    solver_time, slowest_guess = _solver_times(player.stats)
+    return GameResult(
+        seed, result, player.n_moves, player.n_guesses, solver_time, slowest_guess, time.time() - s
+    )
+
+
+def play_batch(
+    seeds: Sequence[int],
+    difficulty: int,
+    engine: str,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    shape: Optional[Tuple[int, int, int]] = None,
+) -> List[GameResult]:
+    s = time.time()
+    field = BatchMineSweeper(seeds, difficulty=difficulty, shape=shape)
+    batch = BatchPlayer(
+        field, max_nodes=max_nodes, timeout=timeout, sampling_timeout=timeout, cache=CACHE, engine=engine
+    )
+    wins = batch.solve()
+    # the games in a batch finish together, so each of them gets the average time.
+    elapsed = (time.time() - s) / len(seeds)
+    results = []
+    for seed, win, n_moves, player in zip(seeds, wins, batch.n_moves, batch.players):
+        solver_time, slowest_guess = _solver_times(player.stats)
+        result = "win" if win else "lose"
+        results.append(GameResult(seed, result, int(n_moves), player.n_guesses, solver_time, slowest_guess, elapsed))
+
+    return results
+
+
+def load_results(path: str) -> List[GameResult]:
+    # the last line may be broken if the previous run was killed while writing it.
+    results = []
+    with open(path) as f:
+        for line in f:
+            try:
+                results.append(GameResult(**json.loads(line)))
+            except (ValueError, TypeError):
+                continue
+
+    return results
+
+
+def solve(
+    seed: int,
+    n_games: int,
+    difficulty: int,
+    engine: str,
+    n_jobs: int = 1,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    shape: Optional[Tuple[int, int, int]] = None,
+    batch_size: int = 1,
+    trace: Optional[str] = None,
+    results: Optional[str] = None,
+    resume: bool = False,
+    game_timeout: Optional[float] = None,
+) -> None:
+    if batch_size > 1 and (trace is not None or game_timeout is not None):
+        raise ValueError("the games played in batches can be neither traced nor timed out one by one")
+    if resume and results is None:
+        raise ValueError("results must be given to resume")
+    if trace is not None:
+        if seed < 0 or seed + n_games > 2**31:
+            raise ValueError(f"the seeds must be in [0, {2**31 - 1}] to be traced")
+
+        # the header is written once before the processes start appending the games.
+        TraceRecorder(trace).close()
+
+    s = time.time()
+    all_seeds = range(seed, seed + n_games)
+    # the games of the other seeds in the file are kept but not summarized.
+    done = []
+    if resume and results is not None and os.path.exists(results):
+        done = [r for r in load_results(results) if r.seed in all_seeds]
+    done_seeds = {r.seed for r in done}
+    seeds = [i for i in all_seeds if i not in done_seeds]
+    kwargs: Dict[str, Any] = dict(
+        difficulty=difficulty, engine=engine, max_nodes=max_nodes, timeout=timeout, shape=shape
+    )
+    f = None
+    if results is not None:
+        f = open(results, "a" if resume else "w")
+        if f.tell() > 0 and not _ends_with_newline(results):
+            f.write("\n")
+
+    try:
+        if batch_size > 1:
+            bounds = list(range(0, len(seeds), batch_size)) + [len(seeds)]
+            batches = [seeds[start:end] for start, end in zip(bounds, bounds[1:])]
+            func = partial(play_batch, **kwargs)
+            if n_jobs == 1:
+                _summarize((r for rs in map(func, batches) for r in rs), n_games, done, f)
+            else:
+                with Pool(n_jobs) as pool:
+                    _summarize((r for rs in pool.imap_unordered(func, batches) for r in rs), n_games, done, f)
+        elif n_jobs == 1:
+            _summarize(map(partial(play, trace=trace, game_timeout=game_timeout, **kwargs), seeds), n_games, done, f)
+        else:
+            # chunksize=1 hands out one seed at a time, so that slow seeds do not block the others.
+            with Pool(n_jobs) as pool:
+                play_game = partial(play, plot_field=False, trace=trace, game_timeout=game_timeout, **kwargs)
+                _summarize(pool.imap_unordered(play_game, seeds, chunksize=1), n_games, done, f)
+    finally:
+        if f is not None:
+            f.close()
 
-    print(f"winning rate: {100 * n_win / n_games:.3f} %")
     print(time.time() - s)
 
 
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _summarize(results: Iterable[GameResult], n_games: int, done: List[GameResult], f: Optional[IO[str]]) -> None:
+    n_win = sum(r.result == "win" for r in done)
+    n_timeout = sum(r.result == "timeout" for r in done)
+    elapsed_times = {r.seed: r.elapsed for r in done}
+    for n_done, r in enumerate(results, start=len(done) + 1):
+        if f is not None:
+            # each game is written as soon as it finishes, so that a stopped run can be resumed.
+            f.write(json.dumps(r._asdict()) + "\n")
+            f.flush()
+
+        n_win += r.result == "win"
+        n_timeout += r.result == "timeout"
+        elapsed_times[r.seed] = r.elapsed
+        print(f"{n_done}: winning {n_win} (seed {r.seed}: {r.result} in {r.elapsed:.2f} s)\n")
+
+    slowest = sorted(elapsed_times, key=lambda seed: elapsed_times[seed], reverse=True)[:5]
+    print(f"winning rate: {100 * n_win / n_games:.3f} %")
+    if n_timeout > 0:
+        print(f"timeouts: {n_timeout}")
+    print("slowest seeds: " + ", ".join(f"{seed} ({elapsed_times[seed]:.2f} s)" for seed in slowest))
+
+
 if __name__ == "__main__":
     """
     Easy   9602/10000
@@ -28,10 +243,41 @@ if __name__ == "__main__":
     Hard    181/400
     """
     parser = ArgumentParser()
-    parser.add_argument("--cpp", default="False", choices=["True", "False"])
+    # auto chooses the engine of each guess by the size of the frontier (cpp is listed only if it is built).
+    parser.add_argument("--engine", default="auto", choices=list(ENGINES))
     parser.add_argument("--diff", default="medium", choices=[d.name for d in Difficulties])
+    # a custom field overrides --diff.
+    parser.add_argument("--custom", type=int, nargs=3, default=None, metavar=("HEIGHT", "WIDTH", "MINES"))
     parser.add_argument("--seed", type=int, default=0)
     parser.add_argument("--N", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=1)
+    # the games are played in lockstep by the given number at once.
+    parser.add_argument("--batch", type=int, default=1)
+    # the exact computation falls back to the sampling if it exceeds either of the budgets.
+    parser.add_argument("--max-nodes", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None)
+    # the moves of each game are appended to the given file, which is read by src.trace.TraceReader.
+    parser.add_argument("--trace", type=str, default=None)
+    # each game is written to the given JSON lines file as soon as it finishes.
+    parser.add_argument("--results", type=str, default=None)
+    # the seeds already in --results are skipped instead of overwriting the file.
+    parser.add_argument("--resume", action="store_true")
+    # the games longer than the given seconds are stopped and recorded as timeout.
+    parser.add_argument("--game-timeout", type=float, default=None)
 
     args = parser.parse_args()
-    solve(seed=args.seed, n_games=args.N, difficulty=getattr(Difficulties, args.diff).value, cpp=eval(args.cpp))
+    solve(
+        seed=args.seed,
+        n_games=args.N,
+        difficulty=getattr(Difficulties, args.diff).value,
+        engine=args.engine,
+        n_jobs=args.jobs,
+        max_nodes=args.max_nodes,
+        timeout=args.timeout,
+        shape=None if args.custom is None else tuple(args.custom),
+        batch_size=args.batch,
+        trace=args.trace,
+        results=args.results,
+        resume=args.resume,
+        game_timeout=args.game_timeout,
+    )
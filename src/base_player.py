@@ -1,20 +1,126 @@
 from __future__ import annotations
 
+import time
 from abc import ABCMeta
 from abc import abstractmethod
 from copy import deepcopy
+from typing import Protocol
 
 import numpy as np
 
 from src.constants import CLOSED
-from src.mine_sweeper import MineSweeper
+from src.presolve import mask_to_indices, presolve
+from src.topology import Topology
+from src.trace import TraceRecorder
+
+
+class Field(Protocol):
+    """
+    The field played by a player, e.g. MineSweeper or one field of a batch.
+    """
+
+    @property
+    def width(self) -> int: ...
+
+    @property
+    def height(self) -> int: ...
+
+    @property
+    def n_mines(self) -> int: ...
+
+    @property
+    def seed(self) -> int | None: ...
+
+    @property
+    def over(self) -> bool: ...
+
+    @property
+    def clear(self) -> bool: ...
+
+    @property
+    def cell_state(self) -> np.ndarray: ...
+
+    @property
+    def cell_state_view(self) -> np.ndarray: ...
+
+    @property
+    def neighbors_view(self) -> tuple[np.ndarray, ...]: ...
+
+    @property
+    def topology(self) -> Topology: ...
+
+    def loc2idx(self, y: int, x: int) -> int: ...
+
+    def start(self, idx: int) -> None: ...
+
+    def open(self, idx: int) -> None: ...
+
+    def open_multiple(self, indices: np.ndarray) -> None: ...
+
+    def set_recorder(self, recorder: TraceRecorder | None) -> None: ...
+
+
+def _neighbor_values(values: np.ndarray, table: np.ndarray) -> np.ndarray:
+    # the values of the neighbors of each cell with the shape of (n_fields, n_cells, 8), where the missing ones are 0.
+    return np.column_stack([values, np.zeros(values.shape[0], dtype=values.dtype)])[:, table]
+
+
+def find_mines(cell_state: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    Find the mines decided by single numbers in each field.
+
+    Args:
+        cell_state (np.ndarray):
+            The state of each cell with the shape of (n_fields, n_cells).
+        table (np.ndarray):
+            The padded neighbor table of the fields.
+
+    Returns:
+        mines (np.ndarray):
+            The flag whether each closed cell is a mine.
+    """
+    neighbors_closed = _neighbor_values(cell_state == CLOSED, table)
+    n_closed = np.count_nonzero(neighbors_closed, axis=2)
+    # all the closed cells around a number are mines if the number equals to the number of closed cells.
+    full = (cell_state > 0) & (cell_state == n_closed)
+    fields, cells, dirs = np.nonzero(neighbors_closed & full[..., np.newaxis])
+    mines = np.zeros_like(full)
+    mines[fields, table[cells, dirs]] = True
+    return mines
+
+
+def find_safe_cells(cell_state: np.ndarray, flags: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    Find the safe cells decided by single numbers and the flags in each field.
+
+    Args:
+        cell_state (np.ndarray):
+            The state of each cell with the shape of (n_fields, n_cells).
+        flags (np.ndarray):
+            The flags put by the player with the same shape as cell_state.
+        table (np.ndarray):
+            The padded neighbor table of the fields.
+
+    Returns:
+        safe (np.ndarray):
+            The flag whether each closed cell is safe.
+    """
+    neighbors_flagged = _neighbor_values(flags, table)
+    neighbors_closed = _neighbor_values(cell_state == CLOSED, table)
+    n_flags = np.count_nonzero(neighbors_flagged, axis=2)
+    # all the other closed cells around a number are safe if the number equals to the number of flags.
+    satisfied = (cell_state > 0) & (cell_state == n_flags)
+    fields, cells, dirs = np.nonzero(neighbors_closed & ~neighbors_flagged & satisfied[..., np.newaxis])
+    safe = np.zeros_like(flags)
+    safe[fields, table[cells, dirs]] = True
+    return safe
 
 
 class BasePlayer(metaclass=ABCMeta):
-    def __init__(self, field: MineSweeper):
+    def __init__(self, field: Field, recorder: TraceRecorder | None = None, flags: np.ndarray | None = None):
         """
         Attributes:
-            field (MineSweeper):
+            field (Field):
                 The mine sweeper field instance.
             H (int):
                 The height of the field.
@@ -22,20 +128,38 @@ class BasePlayer(metaclass=ABCMeta):
                 The width of the field.
             n_open (int):
                 The number of opened cells.
-            neighbors (List[np.ndarray]):
-                The indices of neighbors in each cell.
+            neighbors (tuple[np.ndarray, ...]):
+                The read-only indices of neighbors in each cell shared with the field.
             flags (np.ndarray):
                 The flag whether the corresponding cell has a mine or not.
+                The given array is shared with the caller, e.g. a row of the flags of a batch, and a new one otherwise.
             n_cells (int):
                 The field size.
+            neighbor_table (np.ndarray):
+                The indices of neighbors in each cell with the shape of (n_cells, 8).
+                The missing neighbors are filled by n_cells, so arrays indexed by this table
+                must be padded with one sentinel value at the end.
+            recorder (TraceRecorder | None):
+                The recorder of the moves, which is opt-in as it keeps every move of the game.
+            recorded_flags (np.ndarray):
+                The flags already given to the recorder.
+            n_moves (int):
+                The number of moves that opened cells, including the first one.
+            n_guesses (int):
+                The number of moves that opened cells with the risk of a mine.
         """
         self._field = field
         self._W = field.width
         self._H = field.height
         self._n_cells = field.width * field.height
         self._n_open = 0
-        self._neighbors = self._field.neighbors
-        self._flags = np.zeros(self._W * self._H, dtype=np.bool8)
+        self._neighbors = self._field.neighbors_view
+        self._neighbor_table = self._field.topology.table
+        self._flags = np.zeros(self._W * self._H, dtype=np.bool8) if flags is None else flags
+        self._recorder = recorder
+        self._recorded_flags = np.zeros(self._W * self._H, dtype=np.bool8)
+        self._n_moves = 0
+        self._n_guesses = 0
 
     @property
     def W(self) -> int:
@@ -49,6 +173,14 @@ class BasePlayer(metaclass=ABCMeta):
     def flags(self) -> np.ndarray:
         return deepcopy(self._flags)
 
+    @property
+    def n_moves(self) -> int:
+        return self._n_moves
+
+    @property
+    def n_guesses(self) -> int:
+        return self._n_guesses
+
     @property
     def over(self) -> bool:
         return self._field.over
@@ -58,67 +190,104 @@ class BasePlayer(metaclass=ABCMeta):
         return self._field.clear
 
     def _start(self, idx: int) -> None:
+        self._n_moves += 1
         self._field.start(idx)
 
     def _open(self, idx: int) -> None:
+        self._n_moves += 1
+        self._record_flags()
         self._field.open(idx)
 
     def _open_multiple(self, indices: np.ndarray) -> None:
+        self._n_moves += 1
+        self._record_flags()
         self._field.open_multiple(indices)
 
+    def _record_flags(self) -> None:
+        # the flags are recorded before the next opened cells, so that the replay gets them in the same order.
+        if self._recorder is None:
+            return
+
+        new_flags = self._flags & ~self._recorded_flags
+        self._recorder.record_flags(np.flatnonzero(new_flags))
+        self._recorded_flags |= new_flags
+
+    def _note_move(self, guess: bool, proba: float, elapsed: float) -> None:
+        # the next opened cells are recorded with the probability and the time of the computation.
+        self._n_guesses += guess
+        if self._recorder is not None:
+            self._recorder.note_move(guess, proba, elapsed)
+
     def _build_flags(self) -> None:
-        cell_state = self._field.cell_state
-        cell_opened = cell_state != CLOSED
-        target_indices = np.arange(self._n_cells)[cell_state > 0]
-        for idx in target_indices:
-            neighbor_indices = self._neighbors[idx]
-            neighbors_closed = ~(cell_opened[neighbor_indices])
-            n_closed = np.count_nonzero(neighbors_closed)
-            if cell_state[idx] != n_closed:
-                continue
-
-            self._flags[neighbor_indices[neighbors_closed]] = True
+        self._flags |= find_mines(self._field.cell_state_view[np.newaxis], self._neighbor_table)[0]
 
     def _open_safe_cells(self) -> bool:
-        cell_state = self._field.cell_state
-        cell_opened = cell_state != CLOSED
-        target_indices = np.arange(self._n_cells)[cell_state > 0]
-        open_indices = []
-        for idx in target_indices:
-            neighbor_indices = self._neighbors[idx]
-            n_flags = np.count_nonzero(self._flags[neighbor_indices])
-            if cell_state[idx] != n_flags:
-                continue
+        cell_state = self._field.cell_state_view[np.newaxis]
+        open_indices = np.flatnonzero(find_safe_cells(cell_state, self._flags[np.newaxis], self._neighbor_table)[0])
+        if open_indices.size > 0:
+            self._open_multiple(open_indices)
 
-            open_indices.extend(neighbor_indices[~self._flags[neighbor_indices] & ~cell_opened[neighbor_indices]])
+        return open_indices.size > 0  # opened at least one cell or not
 
-        if len(open_indices) > 0:
-            self._open_multiple(np.unique(open_indices))
+    def presolve(self) -> bool:
+        """
+        Decide the cells by the pairs of numbers, put the flags on the mines and open the safe cells.
+
+        Returns:
+            decided (bool):
+                Whether at least one cell is decided.
+        """
+        cell_state = self._field.cell_state_view
+        undecided = np.append((cell_state == CLOSED) & ~self._flags, False)[self._neighbor_table]
+        n_flags = np.count_nonzero(np.append(self._flags, False)[self._neighbor_table], axis=1)
+        constraints = np.flatnonzero((cell_state > 0) & np.any(undecided, axis=1))
+        # the bits of the masks are the cell indices.
+        masks = [sum(1 << i for i in self._neighbor_table[idx][undecided[idx]].tolist()) for idx in constraints]
+        assignment = presolve(masks, (cell_state - n_flags)[constraints].tolist())
+        if assignment is None:
+            return False
 
-        return len(open_indices) > 0  # opened at least one cell or not
+        mine, safe = assignment
+        self._flags[mask_to_indices(mine, self._n_cells)] = True
+        if safe != 0:
+            self._open_multiple(mask_to_indices(safe, self._n_cells))
+
+        return mine != 0 or safe != 0  # decided at least one cell or not
 
     def _open_land(self) -> None:
-        cell_state = self._field.cell_state
-        cell_closed = cell_state == CLOSED
-        closed_indices = np.arange(self._n_cells)[cell_closed]
-        for idx in closed_indices:
-            neighbor_indices = self._neighbors[idx]
-            n_closed = np.count_nonzero(cell_closed[neighbor_indices])
-            if n_closed == neighbor_indices.size:
-                self._open(idx)
-                return
+        cell_closed = np.append(self._field.cell_state_view == CLOSED, True)
+        is_land = cell_closed[:-1] & np.all(cell_closed[self._neighbor_table], axis=1)
+        if np.any(is_land):
+            self._open(np.argmax(is_land))
+
+    def open_by_proba(self) -> None:
+        """
+        Open the cells by the probabilities of mines, which is the move when no numbers decide any cells.
+        """
+        self._open_by_proba()
 
     @abstractmethod
     def _open_by_proba(self) -> None:
         raise NotImplementedError
 
     def solve(self) -> bool:
+        start_time = time.time()
+        if self._recorder is not None:
+            self._recorder.begin(self.H, self.W, self._field.n_mines, self._field.seed)
+            self._field.set_recorder(self._recorder)
+
         idx = self._field.loc2idx(y=self.H // 2, x=self.W // 2)
         self._start(idx)
 
         while not self.over and not self.clear:
             self._build_flags()
-            if not self._open_safe_cells():
-                self._open_by_proba()
+            # the pairs of numbers are checked only when no single number decides any cells.
+            if not self._open_safe_cells() and not self.presolve():
+                self.open_by_proba()
+
+        if self._recorder is not None:
+            self._record_flags()
+            self._field.set_recorder(None)
+            self._recorder.end(self.clear, time.time() - start_time)
 
         return self.clear
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+from typing import Any, Literal, Sequence
+
+import numpy as np
+
+from src.base_player import find_mines, find_safe_cells
+from src.constants import CLOSED
+from src.mine_sweeper import MineSweeper, label_zero_regions
+from src.player import Player
+from src.topology import Topology
+from src.trace import TraceRecorder
+from src.transposition import TranspositionCache
+
+
+class BatchMineSweeper:
+    """
+    The mine sweeper fields of the same shape played in lockstep.
+    Each field is a row of the 2D arrays and each step is applied to all the active fields at once.
+    The mines of each field are placed by the same random draws as MineSweeper with the same seed.
+
+    Args:
+        seeds (Sequence[int | None]):
+            The random seed of each field.
+        difficulty (Literal[0, 1, 2]):
+            The difficulty of the games.
+        shape (tuple[int, int, int] | None):
+            The custom fields given by (height, width, n_mines).
+            If it is given, difficulty is ignored.
+    """
+
+    def __init__(
+        self,
+        seeds: Sequence[int | None],
+        difficulty: Literal[0, 1, 2] = 0,
+        shape: tuple[int, int, int] | None = None,
+    ):
+        """
+        Attributes:
+            n_fields (int):
+                The number of fields.
+            seeds (list[int | None]):
+                The random seed of each field.
+            field (np.ndarray):
+                The ground truth of each cell with the shape of (n_fields, n_cells).
+            cell_state (np.ndarray):
+                The state of each cell with the shape of (n_fields, n_cells).
+            over (np.ndarray):
+                Whether each game is over.
+            clear (np.ndarray):
+                Whether each game is cleared.
+            zero_labels (np.ndarray | None):
+                The labels of the zero regions in each field.
+        """
+        # the single fields only draw the mines, so that they follow the same random numbers as MineSweeper.
+        self._fields = [MineSweeper(difficulty, seed=seed, plot_field=False, shape=shape) for seed in seeds]
+        self._seeds = list(seeds)
+        self._n_fields = len(self._fields)
+        self._width, self._height = self._fields[0].width, self._fields[0].height
+        self._n_mines = self._fields[0].n_mines
+        self._topology = self._fields[0].topology
+        n_cells = self._width * self._height
+        self._field = np.zeros((self._n_fields, n_cells), dtype=np.int32)
+        self._cell_state = CLOSED * np.ones((self._n_fields, n_cells), dtype=np.int32)
+        self._cell_state_view = self._cell_state.view()
+        self._cell_state_view.flags.writeable = False
+        self._over = np.zeros(self._n_fields, dtype=np.bool8)
+        self._clear = np.zeros(self._n_fields, dtype=np.bool8)
+        self._zero_labels: np.ndarray | None = None
+
+    @property
+    def n_fields(self) -> int:
+        return self._n_fields
+
+    @property
+    def seeds(self) -> list[int | None]:
+        return self._seeds[:]
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def n_mines(self) -> int:
+        return self._n_mines
+
+    @property
+    def topology(self) -> Topology:
+        return self._topology
+
+    @property
+    def cell_state_view(self) -> np.ndarray:
+        return self._cell_state_view
+
+    @property
+    def over(self) -> np.ndarray:
+        return self._over.copy()
+
+    @property
+    def clear(self) -> np.ndarray:
+        return self._clear.copy()
+
+    @property
+    def active(self) -> np.ndarray:
+        return ~self._over & ~self._clear
+
+    def start(self, indices: np.ndarray) -> None:
+        """
+        Args:
+            indices (np.ndarray):
+                The first cell to open in each field.
+        """
+        n_cells = self._width * self._height
+        is_mine = np.zeros((self._n_fields, n_cells + 1), dtype=np.int32)
+        for i, (field, idx) in enumerate(zip(self._fields, indices)):
+            is_mine[i, field.draw_mines(idx)] = 1
+
+        self._field[:] = np.sum(is_mine[:, self._topology.table], axis=2)
+        self._field[is_mine[:, :-1] == 1] = -2
+        self._zero_labels = label_zero_regions(self._field == 0, self._topology.table)
+
+        mask = np.zeros((self._n_fields, n_cells), dtype=np.bool8)
+        mask[np.arange(self._n_fields), indices] = True
+        self.open_multiple(mask)
+
+    def open_multiple(self, mask: np.ndarray) -> None:
+        """
+        Args:
+            mask (np.ndarray):
+                The cells to open with the shape of (n_fields, n_cells).
+                The cells in the finished games are ignored.
+        """
+        mask = mask & self.active[:, np.newaxis]
+        self._cell_state[mask] = self._field[mask]
+        self._over |= np.any(mask & (self._field == -2), axis=1)
+
+        # the zero regions hit by the new cells are opened together with their borders.
+        fields, cells = np.nonzero(mask & (self._field == 0))
+        hit = np.zeros((self._n_fields, self._field.shape[1] + 1), dtype=np.bool8)
+        hit[fields, self._zero_labels[fields, cells]] = True
+        region = np.take_along_axis(hit, self._zero_labels, axis=1)
+        padded = np.column_stack([region, np.zeros(self._n_fields, dtype=np.bool8)])
+        opened = region | np.any(padded[:, self._topology.table], axis=2)
+        self._cell_state[opened] = self._field[opened]
+
+        n_close = np.count_nonzero(self._cell_state == CLOSED, axis=1)
+        self._clear |= (n_close == self._n_mines) & ~self._over
+
+
+class _BatchFieldView:
+    """
+    One field of a batch seen as a Field by Player.
+    The opened cells are only marked, so that the batch opens them together with the other fields.
+    The fields are started and recorded by the batch, not by the view.
+    """
+
+    def __init__(self, batch: BatchMineSweeper, pending: np.ndarray, idx: int):
+        self._batch = batch
+        self._pending = pending
+        self._idx = idx
+
+    @property
+    def width(self) -> int:
+        return self._batch.width
+
+    @property
+    def height(self) -> int:
+        return self._batch.height
+
+    @property
+    def n_mines(self) -> int:
+        return self._batch.n_mines
+
+    @property
+    def seed(self) -> int | None:
+        return self._batch.seeds[self._idx]
+
+    @property
+    def topology(self) -> Topology:
+        return self._batch.topology
+
+    @property
+    def neighbors_view(self) -> tuple[np.ndarray, ...]:
+        return self._batch.topology.neighbors
+
+    @property
+    def cell_state_view(self) -> np.ndarray:
+        return self._batch.cell_state_view[self._idx]
+
+    @property
+    def cell_state(self) -> np.ndarray:
+        return self._batch.cell_state_view[self._idx].copy()
+
+    @property
+    def over(self) -> bool:
+        return bool(self._batch.over[self._idx])
+
+    @property
+    def clear(self) -> bool:
+        return bool(self._batch.clear[self._idx])
+
+    def loc2idx(self, y: int, x: int) -> int:
+        return self._batch.width * y + x
+
+    def start(self, idx: int) -> None:
+        raise NotImplementedError("the fields of a batch are started together by BatchMineSweeper.start")
+
+    def set_recorder(self, recorder: TraceRecorder | None) -> None:
+        raise NotImplementedError("the fields of a batch are not recorded")
+
+    def open(self, idx: int) -> None:
+        self._pending[self._idx, idx] = True
+
+    def open_multiple(self, indices: np.ndarray) -> None:
+        self._pending[self._idx, indices] = True
+
+
+class BatchPlayer:
+    """
+    The player of BatchMineSweeper.
+    The moves decided by single numbers are made for all the fields at once, and the moves decided by the pairs
+    of numbers and the guesses are made field by field by Player, so that each game follows the same moves
+    as Player on MineSweeper with the same seed.
+
+    Args:
+        field (BatchMineSweeper):
+            The batch of the fields.
+        **kwargs:
+            The arguments of Player.
+            If cache is not given, the players share a new TranspositionCache.
+    """
+
+    def __init__(self, field: BatchMineSweeper, **kwargs: Any):
+        """
+        Attributes:
+            flags (np.ndarray):
+                The flag whether each cell has a mine or not with the shape of (n_fields, n_cells).
+            pending (np.ndarray):
+                The cells to open in the next step with the shape of (n_fields, n_cells).
+            players (list[Player]):
+                The player of each field used for the guesses.
+            n_moves (np.ndarray):
+                The number of moves that opened cells in each field, including the first one.
+        """
+        self._field = field
+        self._neighbor_table = field.topology.table
+        n_cells = field.width * field.height
+        self._flags = np.zeros((field.n_fields, n_cells), dtype=np.bool8)
+        self._pending = np.zeros((field.n_fields, n_cells), dtype=np.bool8)
+        self._n_moves = np.zeros(field.n_fields, dtype=np.int64)
+        kwargs.setdefault("cache", TranspositionCache())
+        # each player shares its flags with a row of the batch.
+        self._players = [
+            Player(_BatchFieldView(field, self._pending, i), flags=self._flags[i], **kwargs)
+            for i in range(field.n_fields)
+        ]
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self._flags.copy()
+
+    @property
+    def players(self) -> list[Player]:
+        return self._players[:]
+
+    @property
+    def n_moves(self) -> np.ndarray:
+        return self._n_moves.copy()
+
+    def _build_flags(self, active: np.ndarray) -> None:
+        self._flags |= find_mines(self._field.cell_state_view, self._neighbor_table) & active[:, np.newaxis]
+
+    def _open_safe_cells(self, active: np.ndarray) -> np.ndarray:
+        safe = find_safe_cells(self._field.cell_state_view, self._flags, self._neighbor_table)
+        self._pending |= safe & active[:, np.newaxis]
+        return np.any(self._pending, axis=1)  # opened at least one cell or not in each field
+
+    def solve(self) -> np.ndarray:
+        center = self._field.height // 2 * self._field.width + self._field.width // 2
+        self._field.start(np.full(self._field.n_fields, center))
+        self._n_moves += 1
+
+        while np.any(active := self._field.active):
+            self._build_flags(active)
+            opened = self._open_safe_cells(active)
+            for i in np.flatnonzero(active & ~opened):
+                # the pairs of numbers are checked only when no single number decides any cells as Player.
+                if not self._players[i].presolve():
+                    self._players[i].open_by_proba()
+
+            self._n_moves += np.any(self._pending, axis=1)
+            self._field.open_multiple(self._pending)
+            self._pending[:] = False
+
+        return self._field.clear
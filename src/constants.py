@@ -20,9 +20,6 @@ def combination(n: int, size: int = SIZE) -> np.ndarray:
     return ret
 
 
-COMBINATION = np.array([combination(i) for i in range(SIZE)])
-
-
 @dataclass
 class TargetData:
     """
@@ -37,6 +34,57 @@ class TargetData:
     proba: np.ndarray
 
 
+@dataclass
+class ComponentCounts:
+    """
+    Attributes:
+        n_configs (np.ndarray):
+            The number of valid assignments in a component for each number of mines in the component.
+            The shape is (n_targets + 1, ).
+        mine_counts (np.ndarray):
+            mine_counts[k, i] is the number of valid assignments with k mines where the i-th cell has a mine.
+            The shape is (n_targets + 1, n_targets).
+    """
+
+    n_configs: np.ndarray
+    mine_counts: np.ndarray
+
+
+@dataclass
+class SearchStats:
+    """
+    Attributes:
+        n_nodes (int):
+            The number of search steps.
+        n_contradictions (int):
+            The number of contradictions found by the constraint propagation.
+        n_backtracks (int):
+            The number of backtracks to the last assumption.
+        n_leaves (int):
+            The number of valid assignments reached.
+        n_components (int):
+            The number of independent components in the targets.
+        n_reused (int):
+            The number of components whose enumeration results were reused.
+        n_cached (int):
+            The number of components whose enumeration results were found in the transposition cache.
+        elapsed (float):
+            The wall time of the computation in seconds.
+        ordering (str):
+            The order of the targets assigned in the search.
+    """
+
+    n_nodes: int = 0
+    n_contradictions: int = 0
+    n_backtracks: int = 0
+    n_leaves: int = 0
+    n_components: int = 0
+    n_reused: int = 0
+    n_cached: int = 0
+    elapsed: float = 0.0
+    ordering: str = "constrained"
+
+
 class Difficulties(IntEnum):
     easy = 0
     medium = 1
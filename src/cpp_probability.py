@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Any
+
+from src.constants import TargetData
+from src.probability import ProbabilityCalculator
+
+
+class CppProbabilityCalculator(ProbabilityCalculator):
+    """
+    This class computes the probability of having a mine in each cell by the C++ solver.
+    The arguments are the same as ProbabilityCalculator, but width is required to pass the field as a 2D array.
+    The search budgets, the cache and the representation are not used.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        if self._width is None:
+            raise ValueError("width must be given to use the C++ solver")
+
+    def compute(self) -> tuple[TargetData, float]:
+        return self._compute_by_cpp()
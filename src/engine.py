@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import Sequence
+
+import numpy as np
+
+from src.constants import ComponentCounts, TargetData
+from src.cpp_probability import CppProbabilityCalculator
+from src.frontier_dp import FrontierDPProbabilityCalculator
+from src.probability import ProbabilityCalculator
+
+
+# the components up to this number of targets are enumerated by the search, which has no setup cost.
+SEARCH_MAX_TARGETS = 16
+# the fields up to this number of targets and components in total are left to the search,
+# since each component of the search has its own cost in Python while the C++ solver takes them in one call.
+SEARCH_MAX_TOTAL_TARGETS = 32
+SEARCH_MAX_COMPONENTS = 4
+
+ENGINES: dict[str, type[ProbabilityCalculator]] = {}
+
+
+def register_engine(name: str, calculator: type[ProbabilityCalculator]) -> None:
+    """
+    Register a probability engine, which is a ProbabilityCalculator or its subclass.
+    Each engine takes the same arguments and gives the same TargetData and the probability for the land cells.
+
+    Args:
+        name (str):
+            The name of the engine.
+        calculator (type[ProbabilityCalculator]):
+            The class of the engine.
+    """
+    ENGINES[name] = calculator
+
+
+def get_engine(name: str) -> type[ProbabilityCalculator]:
+    if name not in ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(ENGINES)}, but got {name}")
+
+    return ENGINES[name]
+
+
+def select_engine(component_sizes: Sequence[int], budgeted: bool = False) -> str:
+    """
+    Choose the engine for a field by the number of targets in each component.
+
+    Args:
+        component_sizes (Sequence[int]):
+            The number of targets in each component.
+        budgeted (bool):
+            Whether the computation has max_nodes or timeout.
+            The C++ solver cannot stop at the budgets, so that it is not chosen for the budgeted computations.
+
+    Returns:
+        name (str):
+            "python" if the components are small and few,
+            "cpp" if the C++ solver is available and the computation is not budgeted, and "dp" otherwise.
+    """
+    if (
+        max(component_sizes, default=0) <= SEARCH_MAX_TARGETS
+        and sum(component_sizes) <= SEARCH_MAX_TOTAL_TARGETS
+        and len(component_sizes) <= SEARCH_MAX_COMPONENTS
+    ):
+        return "python"
+
+    return "cpp" if "cpp" in ENGINES and not budgeted else "dp"
+
+
+class AutoProbabilityCalculator(FrontierDPProbabilityCalculator):
+    """
+    This class chooses the engine of each computation by select_engine.
+    The large fields go to the C++ solver if it is available and neither max_nodes nor timeout is given.
+    Otherwise, the small components are enumerated by the search and the large ones by the dynamic programming,
+    so that the enumeration results are shared with the cache and the reuse over the computations,
+    and the budgets raise SearchBudgetExceeded as the other engines.
+    The arguments are the same as ProbabilityCalculator.
+    """
+
+    def _enumerate(self, members: np.ndarray, constraints: np.ndarray) -> ComponentCounts:
+        if members.size <= SEARCH_MAX_TARGETS:
+            # the search of ProbabilityCalculator, which FrontierDPProbabilityCalculator overrides.
+            return ProbabilityCalculator._enumerate(self, members, constraints)
+
+        return super()._enumerate(members, constraints)
+
+    def compute(self) -> tuple[TargetData, float]:
+        budgeted = self._max_nodes is not None or self._timeout is not None
+        engine = select_engine([members.size for members, _ in self._components], budgeted=budgeted)
+        if engine == "cpp" and self._width is not None:
+            return self._compute_by_cpp()
+
+        return super().compute()
+
+
+register_engine("python", ProbabilityCalculator)
+register_engine("dp", FrontierDPProbabilityCalculator)
+register_engine("auto", AutoProbabilityCalculator)
+if importlib.util.find_spec("mine_sweeper_solver") is not None:
+    register_engine("cpp", CppProbabilityCalculator)
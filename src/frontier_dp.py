@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Tuple
+
+import numpy as np
+
+from src.constants import ComponentCounts
+from src.probability import ProbabilityCalculator
+
+
+# the counts of the assignments for the numbers of mines from the first item to the first item plus the size.
+Counts = Tuple[int, np.ndarray]
+
+
+def _add(a: Counts, b: Counts) -> Counts:
+    (a_min, a_counts), (b_min, b_counts) = a, b
+    n_min = min(a_min, b_min)
+    counts = np.zeros(max(a_min + a_counts.size, b_min + b_counts.size) - n_min, dtype=np.float64)
+    a_start, b_start = a_min - n_min, b_min - n_min
+    a_end, b_end = a_start + a_counts.size, b_start + b_counts.size
+    counts[a_start:a_end] += a_counts
+    counts[b_start:b_end] += b_counts
+    return n_min, counts
+
+
+class FrontierDPProbabilityCalculator(ProbabilityCalculator):
+    """
+    This class computes the probability of having a mine in each cell by dynamic programming over the frontier.
+
+    The targets of each component are swept one by one in the order given by ordering.
+    A constraint is open while some of its targets are assigned and the others are not, and the state of the sweep
+    is the number of mines that each open constraint still needs. The assignments that lead to the same state
+    have the same completions, so that they are merged into one state.
+    The forward pass counts the assignments of the swept targets that reach each state by the number of mines,
+    and the backward pass counts the completions of the remaining targets from each state in the same way.
+    The mine counts of a target combine the two passes at the transitions that put a mine on it.
+    The counts only keep the range of the numbers of mines that the state can have, which is narrow on a long
+    and thin frontier, so that the cost grows almost linearly with its length, where the search grows exponentially.
+
+    The arguments are the same as ProbabilityCalculator except that ordering is "frontier" by default,
+    since the breadth-first walk keeps the fewest constraints open on the long frontiers.
+    The walk starts from the end of the component that keeps the fewest constraints open at once.
+    Each state transition of the forward pass is counted as a search step for max_nodes, timeout and the callback.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("ordering", "frontier")
+        super().__init__(*args, **kwargs)
+
+    def _order(self, members: np.ndarray, constraints: np.ndarray) -> np.ndarray:
+        if self._ordering != "frontier" or members.size == 0:
+            return super()._order(members, constraints)
+
+        rev = {i: j for j, i in enumerate(members)}
+        constraint_targets = [[rev[i] for i in self._target_neighbors[idx]] for idx in constraints]
+        target_constraints: list[list[int]] = [[] for _ in range(members.size)]
+        for c, targets in enumerate(constraint_targets):
+            for j in targets:
+                target_constraints[j].append(c)
+
+        def walk(start: int) -> list[int]:
+            order, visited, q = [start], {start}, deque([start])
+            while len(q) > 0:
+                for c in target_constraints[q.popleft()]:
+                    new_targets = [j for j in constraint_targets[c] if j not in visited]
+                    visited.update(new_targets)
+                    order.extend(new_targets)
+                    q.extend(new_targets)
+
+            return order
+
+        def cut_width(order: list[int]) -> int:
+            # the maximum number of the constraints open at once in the sweep.
+            position = np.empty(members.size, dtype=np.int64)
+            position[order] = np.arange(members.size)
+            n_opened = np.zeros(members.size + 1, dtype=np.int64)
+            for targets in constraint_targets:
+                n_opened[position[targets].min()] += 1
+                n_opened[position[targets].max()] -= 1
+
+            return int(np.cumsum(n_opened).max())
+
+        # the last target of a walk is far from its start, so that the walk from it sweeps from one end to the other.
+        orders = [walk(0)]
+        for _ in range(2):
+            orders.append(walk(orders[-1][-1]))
+
+        return np.asarray(min(orders, key=cut_width))
+
+    def _enumerate(self, members: np.ndarray, constraints: np.ndarray) -> ComponentCounts:
+        n_targets = members.size
+        order = self._order(members, constraints)
+        position = np.empty(n_targets, dtype=np.int32)
+        position[order] = np.arange(n_targets)
+        rev = {i: j for j, i in enumerate(members)}
+        # the positions of the targets of each constraint in the sweep.
+        constraint_positions = [sorted(position[rev[i]] for i in self._target_neighbors[idx]) for idx in constraints]
+        needs = [int(self._cell_state[idx] - self._n_flags_in_neighbors[idx]) for idx in constraints]
+        target_constraints: list[list[int]] = [[] for _ in range(n_targets)]
+        for c, positions in enumerate(constraint_positions):
+            for p in positions:
+                target_constraints[p].append(c)
+
+        # the forward pass keeps the states before each target and the valid transitions from them.
+        open_constraints: list[int] = []
+        states: dict[tuple[int, ...], Counts] = {(): (0, np.ones(1, dtype=np.float64))}
+        layers: list[dict[tuple[int, ...], Counts]] = []
+        transitions: list[list[tuple[tuple[int, ...], bool, tuple[int, ...]]]] = []
+        for p in range(n_targets):
+            new_constraints = [c for c in target_constraints[p] if constraint_positions[c][0] == p]
+            keys = open_constraints + new_constraints
+            slots = [keys.index(c) for c in target_constraints[p]]
+            n_left = [sum(q > p for q in constraint_positions[c]) for c in keys]
+            open_constraints = [c for c, n in zip(keys, n_left) if n > 0]
+            new_states: dict[tuple[int, ...], Counts] = {}
+            layer_transitions = []
+            for state, (n_min, counts) in states.items():
+                residuals = list(state) + [needs[c] for c in new_constraints]
+                for mine in [True, False]:
+                    self._visit()
+                    new_residuals = residuals[:]
+                    for s in slots:
+                        new_residuals[s] -= mine
+
+                    # each constraint needs between 0 and the number of its targets left.
+                    if any(not 0 <= r <= n for r, n in zip(new_residuals, n_left)):
+                        self._stats.n_contradictions += 1
+                        continue
+
+                    new_state = tuple(r for r, n in zip(new_residuals, n_left) if n > 0)
+                    layer_transitions.append((state, mine, new_state))
+                    new_counts = (n_min + mine, counts)
+                    if new_state in new_states:
+                        new_counts = _add(new_states[new_state], new_counts)
+                    new_states[new_state] = new_counts
+
+            layers.append(states)
+            transitions.append(layer_transitions)
+            states = new_states
+
+        self._stats.n_leaves += len(states)
+        n_configs = np.zeros(n_targets + 1, dtype=np.float64)
+        # mine_counts are filled in the order of the sweep and returned in the order of members.
+        mine_counts = np.zeros((n_targets + 1, n_targets), dtype=np.float64)
+        if () not in states:
+            return ComponentCounts(n_configs=n_configs, mine_counts=mine_counts)
+
+        n_min, counts = states[()]
+        n_max = n_min + counts.size
+        n_configs[n_min:n_max] = counts
+        # the backward pass counts the completions of the states after each target, which end in the empty state.
+        completions: dict[tuple[int, ...], Counts] = {(): (0, np.ones(1, dtype=np.float64))}
+        for p in range(n_targets - 1, -1, -1):
+            new_completions: dict[tuple[int, ...], Counts] = {}
+            # the forward counts reaching each state after the target by putting a mine on it.
+            with_mine: dict[tuple[int, ...], Counts] = {}
+            for state, mine, new_state in transitions[p]:
+                if new_state not in completions:
+                    continue
+
+                n_min, counts = completions[new_state]
+                new_counts = (n_min + mine, counts)
+                if state in new_completions:
+                    new_counts = _add(new_completions[state], new_counts)
+                new_completions[state] = new_counts
+                if mine:
+                    n_min, counts = layers[p][state]
+                    new_counts = (n_min + 1, counts)
+                    if new_state in with_mine:
+                        new_counts = _add(with_mine[new_state], new_counts)
+                    with_mine[new_state] = new_counts
+
+            for state, (n_min, counts) in with_mine.items():
+                n_completed, completed = completions[state]
+                counts = np.convolve(counts, completed)
+                n_min += n_completed
+                n_max = n_min + counts.size
+                mine_counts[n_min:n_max, order[p]] += counts
+
+            completions = new_completions
+
+        return ComponentCounts(n_configs=n_configs, mine_counts=mine_counts)
@@ -1,12 +1,43 @@
 from __future__ import annotations
 
-from collections import deque
 from copy import deepcopy
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 import numpy as np
 
-from src.constants import CLOSED, DIRS
+from src.constants import CLOSED
+from src.topology import Topology, get_topology
+
+if TYPE_CHECKING:
+    from src.trace import TraceRecorder
+
+
+def label_zero_regions(is_zero: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    Label the connected regions of the cells without mines around them in each field.
+
+    Args:
+        is_zero (np.ndarray):
+            The flag whether each cell has no mines around it with the shape of (n_fields, n_cells).
+        table (np.ndarray):
+            The padded neighbor table of the fields.
+
+    Returns:
+        labels (np.ndarray):
+            Each zero cell gets the smallest index in its region and the other cells get n_cells.
+    """
+    n_fields, size = is_zero.shape
+    labels = np.column_stack([np.where(is_zero, np.arange(size), size), np.full(n_fields, size)])
+    while True:
+        # take the smallest label around each zero cell and follow the labels to their roots.
+        new_labels = labels.copy()
+        new_labels[:, :-1][is_zero] = np.min(labels[:, table], axis=2)[is_zero]
+        new_labels = np.minimum(labels, new_labels)
+        new_labels = np.take_along_axis(new_labels, new_labels, axis=1)
+        if np.array_equal(new_labels, labels):
+            return labels[:, :-1]
+
+        labels = new_labels
 
 
 class MineSweeper:
@@ -25,9 +56,21 @@ class MineSweeper:
             The random seed.
         plot_field (bool):
             Whether to print the field each round.
+        shape (tuple[int, int, int] | None):
+            The custom field given by (height, width, n_mines).
+            If it is given, difficulty is ignored.
+        quiet (bool):
+            Whether to print nothing, not even the judge statements, e.g. for the replays of the games.
     """
 
-    def __init__(self, difficulty: Literal[0, 1, 2] = 0, seed: int | None = None, plot_field: bool = True):
+    def __init__(
+        self,
+        difficulty: Literal[0, 1, 2] = 0,
+        seed: int | None = None,
+        plot_field: bool = True,
+        shape: tuple[int, int, int] | None = None,
+        quiet: bool = False,
+    ):
         """
         Attributes:
             width (int):
@@ -48,23 +91,44 @@ class MineSweeper:
                      0: No mines around this cell.
                      1--8: The corresponding number of mines exist around this cell.
                 The data is kept by 1D array, so we need to transform (y, x) --> y * w + x
-            neighbors (List[np.ndarray]):
+            neighbors (tuple[np.ndarray, ...]):
                 The indices of neighbors in each cell.
+                Each array is read-only, so that the table can be shared without copies.
+            topology (Topology):
+                The neighbor structure shared by all the fields of the same shape.
+            cell_state_view (np.ndarray):
+                The read-only view of cell_state.
+            recorder (TraceRecorder | None):
+                The recorder of the opened cells if the moves are recorded.
         """
+        self._seed = seed
         self._rng = np.random.RandomState(seed)
-        self._width = [9, 16, 30][difficulty]
-        self._height = [9, 16, 16][difficulty]
-        self._n_mines = [10, 40, 100][difficulty]
+        if shape is None:
+            shape = ([9, 16, 16][difficulty], [9, 16, 30][difficulty], [10, 40, 100][difficulty])
+        self._height, self._width, self._n_mines = shape
+        if self._height <= 0 or self._width <= 0:
+            raise ValueError(f"height and width must be positive, but got {self._height} x {self._width}")
         self._field = np.zeros(self.height * self.width, dtype=np.int32)
         self._cell_state = CLOSED * np.ones(self.height * self.width, dtype=np.int32)
-        self._neighbors = [
-            np.asarray([self.loc2idx(y, x) for (y, x) in self.idx2loc(i) + DIRS if not self._out_of_field(y, x)])
-            for i in range(self.height * self.width)
-        ]
+        self._topology = get_topology(self.height, self.width)
+        self._neighbors = self._topology.neighbors
+        # the first cell and its neighbors never have mines, so the bound is given by the smallest neighborhood.
+        max_mines = self._height * self._width - 1 - min(indices.size for indices in self._neighbors)
+        if not 0 <= self._n_mines <= max_mines:
+            shape = f"{self._height} x {self._width}"
+            raise ValueError(f"n_mines must be in [0, {max_mines}] for {shape}, but got {self._n_mines}")
+        self._cell_state_view = self._read_only(self._cell_state.view())
+        self._zero_labels: np.ndarray | None = None
         self._plot_field = plot_field
+        self._quiet = quiet
         self._over = False
         self._clear = False
         self._terminated = False
+        self._recorder: TraceRecorder | None = None
+
+    @property
+    def seed(self) -> int | None:
+        return self._seed
 
     @property
     def width(self) -> int:
@@ -90,9 +154,27 @@ class MineSweeper:
     def cell_state(self) -> np.ndarray:
         return deepcopy(self._cell_state)
 
+    @property
+    def cell_state_view(self) -> np.ndarray:
+        # NOTE: the view follows the updates of the field, so take cell_state if you need a snapshot.
+        return self._cell_state_view
+
     @property
     def neighbors(self) -> list[np.ndarray]:
-        return deepcopy(self._neighbors)
+        return [neighbor_indices.copy() for neighbor_indices in self._neighbors]
+
+    @property
+    def neighbors_view(self) -> tuple[np.ndarray, ...]:
+        return self._neighbors
+
+    @property
+    def topology(self) -> Topology:
+        return self._topology
+
+    @staticmethod
+    def _read_only(array: np.ndarray) -> np.ndarray:
+        array.flags.writeable = False
+        return array
 
     def loc2idx(self, y: int, x: int) -> int:
         if self._out_of_field(y, x):
@@ -109,24 +191,50 @@ class MineSweeper:
 
     def start(self, idx: int) -> None:
         # when opening first panel, you have to call start and specify which position you would like to open.
-        non_neighbors = np.setdiff1d(
-            np.arange(self.width * self.height), np.append(self._neighbors[idx], idx), assume_unique=True
-        )
-        mine_loc = self._rng.choice(non_neighbors, size=self._n_mines, replace=False)
+        if self._n_mines > self._max_mines(idx):
+            raise ValueError(f"{self._n_mines} mines do not fit around the first cell {idx}")
+
+        mine_loc = self.draw_mines(idx)
+        is_mine = np.zeros(self.height * self.width + 1, dtype=np.int32)
+        is_mine[mine_loc] = 1
+        # the sum over the padded neighbor table counts the mines around every cell at once.
+        self._field[:] = np.sum(is_mine[self._topology.table], axis=1)
         self._field[mine_loc] = -2
+        self._zero_labels = None
 
-        for i in range(self.height * self.width):
-            if self._field[i] == -2:
-                continue
+        self.open(idx)
 
-            self._field[i] = np.sum(self._field[self._neighbors[i]] == -2)
+    def _max_mines(self, idx: int) -> int:
+        # the number of cells that can have mines when the first cell is idx.
+        return self.height * self.width - 1 - self._neighbors[idx].size
 
-        self.open(idx)
+    def draw_mines(self, idx: int) -> np.ndarray:
+        """
+        Draw the cells of the mines from the random numbers of this field without placing them.
+
+        Args:
+            idx (int):
+                The first cell to open, which and whose neighbors never have mines.
+
+        Returns:
+            mine_loc (np.ndarray):
+                The indices of the mines.
+        """
+        non_neighbors = np.setdiff1d(
+            np.arange(self.width * self.height), np.append(self._neighbors[idx], idx), assume_unique=True
+        )
+        return self._rng.choice(non_neighbors, size=self._n_mines, replace=False)
 
     def open(self, idx: int) -> None:
         self.open_multiple(np.asarray([idx]))
 
+    def set_recorder(self, recorder: TraceRecorder | None) -> None:
+        self._recorder = recorder
+
     def open_multiple(self, indices: np.ndarray) -> None:
+        if self._recorder is not None:
+            self._recorder.record_open(indices)
+
         self._cell_state[indices] = self._field[indices]
         if np.any(self._cell_state[indices] == -2):
             self._over = True
@@ -135,17 +243,24 @@ class MineSweeper:
         n_close = np.count_nonzero(self._cell_state == CLOSED)
         if n_close == self._n_mines and not self._over:
             self._clear = True
-        if not self._terminated:
+        if not self._terminated and not self._quiet:
             self.plot_field()
 
     def _open_around_zero(self, new_zero_indices: list[int]) -> None:
-        q = deque(new_zero_indices)
-        while len(q) > 0:
-            idx = q.popleft()
-            neighbor_indices = self._neighbors[idx]
-            closed = self._cell_state[neighbor_indices] == CLOSED
-            self._cell_state[neighbor_indices] = self._field[neighbor_indices]
-            q.extend([i for i in neighbor_indices[closed] if self._cell_state[i] == 0])
+        if len(new_zero_indices) == 0:
+            return
+        if self._zero_labels is None:
+            self._zero_labels = self._label_zero_regions()
+
+        labels = self._zero_labels[new_zero_indices]
+        region = np.isin(self._zero_labels, labels[labels < self._zero_labels.size])
+        # a zero region is opened together with its border.
+        indices = np.union1d(np.flatnonzero(region), self._topology.table[region])
+        indices = indices[indices < self._zero_labels.size]
+        self._cell_state[indices] = self._field[indices]
+
+    def _label_zero_regions(self) -> np.ndarray:
+        return label_zero_regions((self._field == 0)[np.newaxis], self._topology.table)[0]
 
     def plot_field(self) -> None:
         print(self._get_judge_statement())
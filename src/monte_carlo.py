@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, Sequence
+
+import numpy as np
+
+from src.constants import ComponentCounts, SearchStats, TargetData
+from src.probability import ProbabilityCalculator
+
+
+class MonteCarloProbabilityCalculator(ProbabilityCalculator):
+    """
+    This class estimates the probability of having a mine in each cell by sampling.
+
+    Each component is sampled by the sequential importance sampling.
+    The targets are assigned one by one uniformly from the values that do not violate the constraints around them
+    and each sample is weighted by the number of choices we had, so that the weighted samples give
+    unbiased estimates of the counts obtained by the exact enumeration.
+
+    Args:
+        cell_state (np.ndarray):
+                The state of each cell.
+                    -1: Closed.
+                     0: No mines around this cell.
+                     1--8: The corresponding number of mines exist around this cell.
+                The data is kept by 1D array, so we need to transform (y, x) --> y * w + x
+        flags (np.ndarray):
+                The flag whether the corresponding cell has a mine or not.
+        neighbors (Sequence[np.ndarray]):
+            The indices of neighbors in each cell.
+        n_mines (int):
+            The number of mines in the field.
+        callback (Callable[[SearchStats], None] | None):
+            The function called with the sampling statistics at the end of each computation.
+        n_samples (int):
+            The maximum number of samples for each component.
+        timeout (float | None):
+            The time budget of each computation in seconds.
+            The sampling stops when it is exceeded, but each component gets at least one valid sample.
+        n_batches (int):
+            The number of batches used to estimate the standard errors.
+        seed (int | None):
+            The random seed.
+    """
+
+    def __init__(
+        self,
+        cell_state: np.ndarray,
+        flags: np.ndarray,
+        neighbors: Sequence[np.ndarray],
+        n_mines: int,
+        callback: Callable[[SearchStats], None] | None = None,
+        n_samples: int = 1000,
+        timeout: float | None = None,
+        n_batches: int = 10,
+        seed: int | None = None,
+    ):
+        """
+        Attributes:
+            stderr (np.ndarray):
+                The standard error of the probability of each target.
+            p_land_stderr (float):
+                The standard error of the probability for the land cells.
+        """
+        super().__init__(cell_state=cell_state, flags=flags, neighbors=neighbors, n_mines=n_mines, callback=callback)
+        self._n_samples = n_samples
+        self._sampling_timeout = timeout
+        self._n_batches = n_batches
+        self._rng = np.random.RandomState(seed)
+        self._stderr = np.zeros(self._target.index.size, dtype=np.float64)
+        self._p_land_stderr = 0.0
+
+    @property
+    def stderr(self) -> tuple[np.ndarray, float]:
+        return self._stderr.copy(), self._p_land_stderr
+
+    def _draw(self, needs: list[int], sizes: list[int], cell_constraints: list[list[int]], mines: np.ndarray) -> float:
+        n_mines_around, n_undecided = [0] * len(needs), sizes[:]
+        weight = 1.0
+        for i, (u, constraints) in enumerate(zip(self._rng.random_sample(mines.size), cell_constraints)):
+            self._stats.n_nodes += 1
+            can_be_mine = all(n_mines_around[c] < needs[c] for c in constraints)
+            can_be_safe = all(n_mines_around[c] + n_undecided[c] > needs[c] for c in constraints)
+            if can_be_mine and can_be_safe:
+                weight *= 2.0
+                mine = bool(u < 0.5)
+            elif can_be_mine or can_be_safe:
+                mine = can_be_mine
+            else:  # contradiction
+                self._stats.n_contradictions += 1
+                return 0.0
+
+            mines[i] = mine
+            for c in constraints:
+                n_undecided[c] -= 1
+                n_mines_around[c] += mine
+
+        self._stats.n_leaves += 1
+        return weight
+
+    def _sample(self, members: np.ndarray, constraints: np.ndarray, deadline: float) -> list[ComponentCounts]:
+        n_targets = members.size
+        rev = {i: j for j, i in enumerate(members)}
+        constraint_targets = [[rev[i] for i in self._target_neighbors[idx]] for idx in constraints]
+        needs = [int(self._cell_state[idx] - self._n_flags_in_neighbors[idx]) for idx in constraints]
+        cell_constraints: list[list[int]] = [[] for _ in range(n_targets)]
+        for c, targets in enumerate(constraint_targets):
+            for i in targets:
+                cell_constraints[i].append(c)
+
+        batches = [
+            ComponentCounts(n_configs=np.zeros(n_targets + 1), mine_counts=np.zeros((n_targets + 1, n_targets)))
+            for _ in range(self._n_batches)
+        ]
+        sizes = [len(targets) for targets in constraint_targets]
+        n_valid, mines = 0, np.zeros(n_targets, dtype=np.bool8)
+        for t in range(self._n_samples):
+            if time.time() > deadline and n_valid > 0:
+                break
+
+            weight = self._draw(needs, sizes, cell_constraints, mines)
+            if weight == 0.0:
+                continue
+
+            n_valid += 1
+            batch, k = batches[t % self._n_batches], np.count_nonzero(mines)
+            batch.n_configs[k] += weight
+            batch.mine_counts[k, mines] += weight
+
+        return batches
+
+    def compute(self) -> tuple[TargetData, float]:
+        # the targets of each component are sampled in the order of their indices.
+        self._stats = SearchStats(n_components=len(self._components), ordering="index")
+        self._start_time = time.time()
+        deadline = np.inf if self._sampling_timeout is None else self._start_time + self._sampling_timeout
+        proba4land = 0.0
+        if self._target.index.size > 0:
+            batches = []
+            for i, (members, constraints) in enumerate(self._components):
+                # share the remaining time among the remaining components.
+                n_remaining = len(self._components) - i
+                component_deadline = time.time() + (deadline - time.time()) / n_remaining
+                batches.append(self._sample(members, constraints, component_deadline))
+
+            results = []
+            for b in range(self._n_batches):
+                counts = [component_batches[b] for component_batches in batches]
+                if all(np.any(c.n_configs > 0) for c in counts):
+                    results.append((self._combine(counts), self._target.proba.copy()))
+
+            counts = [
+                ComponentCounts(
+                    n_configs=np.sum([c.n_configs for c in component_batches], axis=0),
+                    mine_counts=np.sum([c.mine_counts for c in component_batches], axis=0),
+                )
+                for component_batches in batches
+            ]
+            proba4land = self._combine(counts)
+            if len(results) >= 2:
+                self._p_land_stderr = np.std([p for p, _ in results], ddof=1) / np.sqrt(len(results))
+                self._stderr = np.std([proba for _, proba in results], axis=0, ddof=1) / np.sqrt(len(results))
+            else:
+                self._p_land_stderr, self._stderr[:] = np.inf, np.inf
+
+        self._stats.elapsed = time.time() - self._start_time
+        if self._callback is not None:
+            self._callback(self.stats)
+
+        return self._target, proba4land
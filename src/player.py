@@ -1,24 +1,138 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
 import numpy as np
 
-from src.base_player import BasePlayer
-from src.probability import ProbabilityCalculator
+from src.base_player import BasePlayer, Field
+from src.constants import SearchStats
+from src.engine import get_engine
+from src.monte_carlo import MonteCarloProbabilityCalculator
+from src.probability import ProbabilityCalculator, SearchBudgetExceeded
+from src.trace import TraceRecorder
+from src.transposition import TranspositionCache
 
 
 class Player(BasePlayer):
+    """
+    Args:
+        field (Field):
+            The mine sweeper field instance, e.g. MineSweeper.
+        max_nodes (int | None):
+            The maximum number of search steps for the exact computation of each guess.
+        timeout (float | None):
+            The time budget in seconds for the exact computation of each guess.
+            If the exact computation exceeds max_nodes or timeout, the probabilities are estimated by sampling.
+        n_samples (int):
+            The maximum number of samples for each component in the sampling.
+        sampling_timeout (float | None):
+            The time budget in seconds for the sampling of each guess.
+        cache (TranspositionCache | None):
+            The cache of the enumeration results, which can be shared by many players.
+        engine (str):
+            The name of the engine in src.engine.ENGINES for the exact computation of each guess.
+            "python" enumerates the assignments by the search of ProbabilityCalculator.
+            "dp" counts them by the dynamic programming of FrontierDPProbabilityCalculator,
+            which is faster on the long frontiers.
+            "cpp" uses the C++ solver if it is built.
+            "auto" chooses one of them on each guess by the size of the frontier.
+        recorder (TraceRecorder | None):
+            The recorder of the moves of the game.
+        flags (np.ndarray | None):
+            The array of the flags shared with the caller. A new array is used if not given.
+    """
+
+    def __init__(
+        self,
+        field: Field,
+        max_nodes: int | None = None,
+        timeout: float | None = None,
+        n_samples: int = 1000,
+        sampling_timeout: float | None = None,
+        cache: TranspositionCache | None = None,
+        engine: str = "python",
+        recorder: TraceRecorder | None = None,
+        flags: np.ndarray | None = None,
+    ):
+        """
+        Attributes:
+            prob (ProbabilityCalculator | None):
+                The probability calculator kept over the game.
+                It reuses the enumeration results of the frontier regions that did not change.
+            stats (list[SearchStats]):
+                The search statistics of each guess.
+            calculator (type[ProbabilityCalculator]):
+                The class of the engine.
+        """
+        super().__init__(field, recorder=recorder, flags=flags)
+        self._prob: ProbabilityCalculator | None = None
+        self._stats: list[SearchStats] = []
+        self._max_nodes = max_nodes
+        self._timeout = timeout
+        self._n_samples = n_samples
+        self._sampling_timeout = sampling_timeout
+        self._cache = cache
+        self._calculator = get_engine(engine)
+
+    @property
+    def stats(self) -> list[SearchStats]:
+        return self._stats[:]
+
     def _open_by_proba(self) -> None:
-        prob = ProbabilityCalculator(
-            cell_state=self._field.cell_state,
-            flags=self.flags,
-            neighbors=self._field.neighbors,
-            n_mines=self._field.n_mines,
-        )
-        target, p_land = prob.compute()
+        if self._prob is None:
+            self._prob = self._calculator(
+                cell_state=self._field.cell_state,
+                flags=self.flags,
+                neighbors=self._field.neighbors_view,
+                n_mines=self._field.n_mines,
+                max_nodes=self._max_nodes,
+                timeout=self._timeout,
+                cache=self._cache,
+                width=self._W,
+            )
+        else:
+            self._prob.update(cell_state=self._field.cell_state, flags=self.flags)
+
+        try:
+            target, p_land = self._prob.compute()
+        except SearchBudgetExceeded:
+            # the time of the aborted search is a part of this move.
+            self._open_by_sampling(self._prob.stats.elapsed)
+            return
+
+        self._stats.append(self._prob.stats)
+        elapsed = self._prob.stats.elapsed
         safe_cell_exist = np.count_nonzero(target.proba == 0.0)
 
         if safe_cell_exist:
             self._flags[target.index[target.proba == 1.0]] = True
+            self._note_move(False, 0.0, elapsed)
             self._open_multiple(target.index[target.proba == 0.0])
         elif target.proba.size != 0 and np.min(target.proba) < p_land:
+            self._note_move(True, np.min(target.proba), elapsed)
+            self._open(target.index[np.argmin(target.proba)])
+        else:
+            self._note_move(True, p_land, elapsed)
+            self._open_land()
+
+    def _open_by_sampling(self, elapsed: float = 0.0) -> None:
+        prob = MonteCarloProbabilityCalculator(
+            cell_state=self._field.cell_state,
+            flags=self.flags,
+            neighbors=self._field.neighbors_view,
+            n_mines=self._field.n_mines,
+            n_samples=self._n_samples,
+            timeout=self._sampling_timeout,
+            seed=len(self._stats),
+        )
+        target, p_land = prob.compute()
+        stats = replace(prob.stats, elapsed=prob.stats.elapsed + elapsed)
+        self._stats.append(stats)
+
+        # the estimates are not exact, so we neither put flags nor open multiple cells.
+        if target.proba.size != 0 and np.min(target.proba) < p_land:
+            self._note_move(True, np.min(target.proba), stats.elapsed)
             self._open(target.index[np.argmin(target.proba)])
         else:
+            self._note_move(True, p_land, stats.elapsed)
             self._open_land()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from itertools import combinations
+
+import numpy as np
+
+
+# int.bit_count is available from Python 3.10.
+popcount = getattr(int, "bit_count", lambda x: bin(x).count("1"))
+
+
+def mask_to_indices(mask: int, size: int) -> np.ndarray:
+    # the indices of the bits set in mask, where size is the number of bits.
+    bits = np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(bits, bitorder="little")[:size])
+
+
+def _overlapping_pairs(masks: list[int]) -> list[tuple[int, int]]:
+    constraints_of_bit: dict[int, list[int]] = {}
+    for c, mask in enumerate(masks):
+        while mask:
+            bit = mask & -mask
+            constraints_of_bit.setdefault(bit, []).append(c)
+            mask ^= bit
+
+    return sorted({pair for constraints in constraints_of_bit.values() for pair in combinations(constraints, 2)})
+
+
+def presolve(masks: list[int], needs: list[int]) -> tuple[int, int] | None:
+    """
+    Find the cells decided by each constraint alone and by the pairs of overlapping constraints.
+    For a pair (a, b), the number of mines in the shared cells is bounded by both constraints,
+    which bounds the number of mines in the cells only a has and the cells only b has.
+    The subset rule (1-1 against a wall) and the difference rule (1-2) are the special cases of it.
+    The rules are applied until nothing changes.
+
+    Args:
+        masks (list[int]):
+            The bitmask of the undecided cells around each constraint.
+        needs (list[int]):
+            The number of mines that each constraint needs in its cells.
+
+    Returns:
+        assignment (tuple[int, int] | None):
+            The bitmasks of the cells that must be mines and the cells that must be safe.
+            None if the constraints contradict each other.
+    """
+    pairs = _overlapping_pairs(masks)
+    mine, safe = 0, 0
+    changed = True
+    while changed:
+        decided = mine | safe
+        current = [(mask & ~decided, need - popcount(mask & mine)) for mask, need in zip(masks, needs)]
+        new_mine, new_safe = mine, safe
+        for mask, need in current:
+            n_cells = popcount(mask)
+            if need < 0 or need > n_cells:  # contradiction
+                return None
+            if need == 0:
+                new_safe |= mask
+            elif need == n_cells:
+                new_mine |= mask
+
+        for a, b in pairs:
+            (mask_a, need_a), (mask_b, need_b) = current[a], current[b]
+            shared = mask_a & mask_b
+            if shared == 0:
+                continue
+
+            only_a, only_b = mask_a & ~mask_b, mask_b & ~mask_a
+            n_only_a, n_only_b, n_shared = popcount(only_a), popcount(only_b), popcount(shared)
+            # the range of the number of mines in the shared cells.
+            lo, hi = max(0, need_a - n_only_a, need_b - n_only_b), min(need_a, need_b, n_shared)
+            if lo > hi:  # contradiction
+                return None
+            if lo == n_shared:
+                new_mine |= shared
+            elif hi == 0:
+                new_safe |= shared
+
+            for only, n_only, need in [(only_a, n_only_a, need_a), (only_b, n_only_b, need_b)]:
+                if need - hi == n_only:
+                    new_mine |= only
+                elif need - lo == 0:
+                    new_safe |= only
+
+        if new_mine & new_safe:  # contradiction
+            return None
+
+        changed = (new_mine, new_safe) != (mine, safe)
+        mine, safe = new_mine, new_safe
+
+    return mine, safe
@@ -1,17 +1,51 @@
 from __future__ import annotations
 
+import math
+import time
+from collections import deque
+from dataclasses import replace
+from typing import Callable, Literal, Sequence
+
 import numpy as np
 
-from src.constants import CLOSED, COMBINATION, CellStates, TargetData
+from src.constants import CLOSED, CellStates, ComponentCounts, SearchStats, TargetData
+from src.presolve import popcount, presolve
+from src.transposition import TranspositionCache, canonicalize
 
 
 MINE, NONE, SAFE = CellStates.mine.value, CellStates.none.value, CellStates.safe.value
+# How many search steps we take between the callback calls.
+CALLBACK_INTERVAL = 10000
+# How many leaves of the bitset search we keep before adding them to the counts.
+LEAF_BUFFER_SIZE = 4096
+
+
+class SearchBudgetExceeded(Exception):
+    """The exact search exceeded the node or time budget."""
+
+
+def _land_counts(n_land_cells: int, n_land_mines: np.ndarray) -> np.ndarray:
+    # the number of ways to put n_land_mines[i] mines in the land cells up to a common power of two.
+    # the binomials are exact integers and they are scaled before the conversion, so they never overflow.
+    counts = [math.comb(n_land_cells, m) if 0 <= m <= n_land_cells else 0 for m in n_land_mines.tolist()]
+    shift = max(max(counts, default=0).bit_length() - 1, 0)
+    return np.asarray([c / (1 << shift) for c in counts], dtype=np.float64)
+
+
+def _rescale(values: np.ndarray) -> np.ndarray:
+    # scale by a power of two, which is exact in float64, so that the maximum gets close to 1.
+    _, exponent = np.frexp(np.max(values, initial=0.0))
+    return np.ldexp(values, -exponent)
 
 
 class ProbabilityCalculator:
     """
     This class computes the probability of having a mine in each cell.
 
+    The target cells are split into components that do not share any opened cells.
+    Each component is enumerated on its own into a histogram of the number of mines and
+    the histograms are combined with the number of ways to put the remaining mines in the land cells.
+
     Args:
         cell_state (np.ndarray):
                 The state of each cell.
@@ -21,18 +55,50 @@ class ProbabilityCalculator:
                 The data is kept by 1D array, so we need to transform (y, x) --> y * w + x
         flags (np.ndarray):
                 The flag whether the corresponding cell has a mine or not.
-        neighbors (list[np.ndarray]):
+        neighbors (Sequence[np.ndarray]):
             The indices of neighbors in each cell.
         n_mines (int):
             The number of mines in the field.
+        callback (Callable[[SearchStats], None] | None):
+            The function called with the search statistics every CALLBACK_INTERVAL search steps
+            and at the end of each computation.
+        max_nodes (int | None):
+            The maximum number of search steps in each computation.
+            If the search exceeds it, SearchBudgetExceeded is raised.
+        timeout (float | None):
+            The time budget of each computation in seconds.
+            If the search exceeds it, SearchBudgetExceeded is raised.
+        representation (Literal["array", "bitset"]):
+            The state representation in the search.
+            "array" keeps the state of each target in an array and propagates the constraints by NumPy.
+            "bitset" keeps the mines, the safe cells and the neighbors of each constraint as bitmasks,
+            so that the propagation only needs ANDs and popcounts.
+        cache (TranspositionCache | None):
+            The cache of the enumeration results shared over the computations and the games.
+            The components with the same pattern of numbers and targets up to the symmetries are not enumerated again.
+        width (int | None):
+            The width of the field, which is required to find the patterns for the cache.
+        ordering (Literal["index", "frontier", "constrained"]):
+            The order of the targets assigned in the search.
+            "index" follows the indices of the cells, i.e. the row-major order.
+            "frontier" walks the targets by breadth-first search over the constraints they share.
+            "constrained" picks the target in the constraint with the fewest unassigned targets first,
+            so that the constraints are closed and the contradictions are found as early as possible.
     """
 
     def __init__(
         self,
         cell_state: np.ndarray,
         flags: np.ndarray,
-        neighbors: list[np.ndarray],
+        neighbors: Sequence[np.ndarray],
         n_mines: int,
+        callback: Callable[[SearchStats], None] | None = None,
+        max_nodes: int | None = None,
+        timeout: float | None = None,
+        representation: Literal["array", "bitset"] = "bitset",
+        cache: TranspositionCache | None = None,
+        width: int | None = None,
+        ordering: Literal["index", "frontier", "constrained"] = "constrained",
     ):
         """
         Attributes:
@@ -46,53 +112,128 @@ class ProbabilityCalculator:
                 As these numbers are repeatedly used, we make a cache for them.
             target_neighbors (np.ndarray):
                 The indices of the target neighbors in the target.state array.
-            states (np.ndarray):
-                The states of each cell.
-            counts (np.ndarray):
-                The counts of how many times each cell has a mine.
+            components (list[tuple[np.ndarray, np.ndarray]]):
+                The indices of the targets and the opened cells in each independent component.
             n_land_cells (int):
                 The number of land cells.
-            count4land (int):
-                The counts of how many times each land cell has a mine.
-            total_count (int):
-                The counts of how many states we consider.
             opened_indices (int):
                 The indices of opened cells.
+            constraints (np.ndarray):
+                The indices of the opened cells in the component being enumerated.
+            constraint_targets (list[np.ndarray]):
+                The indices of the neighbors of each constraint in the component states array.
+            states (np.ndarray):
+                The states of each cell in the component being enumerated.
+            n_configs (np.ndarray):
+                The counts of valid assignments for each number of mines in the component.
+            mine_counts (np.ndarray):
+                The counts of how many times each cell has a mine for each number of mines in the component.
             n_checked (int):
                 Until what target we checked up to now.
                 It is used for recursion.
+            masks (list[int]):
+                The bitmask of the neighbors of each constraint in the component being enumerated by bitsets.
+            needs (list[int]):
+                The number of mines that each constraint needs in the component being enumerated by bitsets.
+            leaves (list[int]):
+                The bitmasks of mines in the valid assignments that are not added to the counts yet.
+            stats (SearchStats):
+                The search statistics of the latest computation.
+            cached_counts (dict[tuple[int, ...], ComponentCounts]):
+                The enumeration results of the components in the previous computation.
+                The key is the indices of the targets in each component.
+            dirty (np.ndarray):
+                Whether each cell or its neighbors changed since the previous computation.
         """
-        self._cell_state = cell_state
         self._neighbors = neighbors
-        self._n_flags = np.count_nonzero(flags)
         self._n_mines = n_mines
         self._n_cells = flags.size
+        self._cell_state: np.ndarray
+        self._flags: np.ndarray
+        self._n_flags: int
+        self._is_land: np.ndarray
+        self._n_flags_in_neighbors: np.ndarray
+        self._n_closed_in_neighbors: np.ndarray
+        self._target_neighbors: list[np.ndarray]
+        self._target: TargetData
+        self._n_land_cells: int
+        self._opened_indices: np.ndarray
+        self._components: list[tuple[np.ndarray, np.ndarray]]
+        self._constraints: np.ndarray
+        self._constraint_targets: list[np.ndarray]
+        self._states: np.ndarray
+        self._assumed: np.ndarray
+        self._n_configs: np.ndarray
+        self._mine_counts: np.ndarray
+        self._n_checked = 0
+        self._callback = callback
+        self._max_nodes = max_nodes
+        self._timeout = timeout
+        if representation not in ["array", "bitset"]:
+            raise ValueError(f"representation must be either array or bitset, but got {representation}")
+
+        self._representation = representation
+        if ordering not in ["index", "frontier", "constrained"]:
+            raise ValueError(f"ordering must be one of index, frontier and constrained, but got {ordering}")
+
+        self._ordering = ordering
+        if cache is not None and width is None:
+            raise ValueError("width must be given to use the cache")
+
+        self._cache = cache
+        self._width = width
+        self._masks: list[int] = []
+        self._needs: list[int] = []
+        self._full_mask = 0
+        self._leaves: list[int] = []
+        self._stats = SearchStats(ordering=ordering)
+        self._start_time = 0.0
+        self._cached_counts: dict[tuple[int, ...], ComponentCounts] = {}
+        self._dirty = np.ones(self._n_cells, dtype=np.bool8)
+
+        self._setup(cell_state, flags)
+
+    @property
+    def stats(self) -> SearchStats:
+        return replace(self._stats)
+
+    def _setup(self, cell_state: np.ndarray, flags: np.ndarray) -> None:
+        self._cell_state = cell_state
+        self._flags = flags
+        self._n_flags = np.count_nonzero(flags)
         self._is_land = np.asarray(
             [
                 cell_state[idx] == CLOSED and np.count_nonzero(cell_state[neighbors] == CLOSED) == len(neighbors)
                 for idx, neighbors in enumerate(self._neighbors)
             ]
         )
-        self._n_flags_in_neighbors: np.ndarray
-        self._n_closed_in_neighbors: np.ndarray
-        self._target_neighbors: np.ndarray
-        self._states: np.ndarray
-        self._counts: np.ndarray
-        self._assumed: np.ndarray
-
         self._target = self._init_target(flags)
         self._n_land_cells = np.count_nonzero(self._is_land)
-        self._count4land = 0
-        self._total_count = 0
         self._opened_indices = np.arange(self._n_cells)[cell_state > 0]
-        self._n_checked = 0
+        self._components = self._split_components()
+
+    def update(self, cell_state: np.ndarray, flags: np.ndarray) -> None:
+        """
+        Update the field for the next computation.
+        The enumeration results of the components that do not touch any changed cells are reused.
+
+        Args:
+            cell_state (np.ndarray):
+                The new state of each cell.
+            flags (np.ndarray):
+                The new flags.
+        """
+        changed_indices = np.arange(self._n_cells)[(cell_state != self._cell_state) | (flags != self._flags)]
+        self._dirty[changed_indices] = True
+        for idx in changed_indices:
+            # the cells around the changed cells see the different numbers of flags or targets.
+            self._dirty[self._neighbors[idx]] = True
+
+        self._setup(cell_state, flags)
 
     def _init_target(self, flags: np.ndarray) -> TargetData:
         mask = (self._cell_state == CLOSED) & (~flags) & (~self._is_land)
         target_indices = np.arange(self._n_cells)[mask]
-        self._states = np.full(target_indices.size, NONE, dtype=np.int32)
-        self._counts = np.zeros(target_indices.size, dtype=np.float64)
-        self._assumed = np.zeros(target_indices.size, dtype=np.bool8)
         target = TargetData(
             index=target_indices,
             proba=np.zeros(target_indices.size, dtype=np.float64),
@@ -113,19 +254,42 @@ class ProbabilityCalculator:
 
         return target
 
+    def _split_components(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        # targets are connected if they share an opened cell.
+        target_indices = self._target.index
+        labels = np.full(target_indices.size, -1, dtype=np.int32)
+        components = []
+        for start in range(target_indices.size):
+            if labels[start] != -1:
+                continue
+
+            labels[start] = len(components)
+            members, constraints, q = [start], set(), deque([start])
+            while len(q) > 0:
+                neighbor_indices = self._neighbors[target_indices[q.popleft()]]
+                for idx in neighbor_indices[self._cell_state[neighbor_indices] > 0]:
+                    if idx in constraints:
+                        continue
+
+                    constraints.add(idx)
+                    new_members = [i for i in self._target_neighbors[idx] if labels[i] == -1]
+                    labels[new_members] = len(components)
+                    members.extend(new_members)
+                    q.extend(new_members)
+
+            components.append((np.sort(members), np.sort(list(constraints))))
+
+        return components
+
     def _add_count(self) -> None:
         new_mine_flags = self._states == MINE
-        n_remaining_mines = self._n_mines - self._n_flags - np.count_nonzero(new_mine_flags)
-        if n_remaining_mines < 0:  # contradiction
-            return
-
-        counts = COMBINATION[self._n_land_cells, n_remaining_mines]
-        self._total_count += counts
-        self._counts[new_mine_flags] += counts
-        if n_remaining_mines - 1 >= 0 and self._n_land_cells - 1 >= 0:
-            self._count4land += COMBINATION[self._n_land_cells - 1, n_remaining_mines - 1]
+        n_mines = np.count_nonzero(new_mine_flags)
+        self._stats.n_leaves += 1
+        self._n_configs[n_mines] += 1
+        self._mine_counts[n_mines, new_mine_flags] += 1
 
     def _update_target(self) -> None:
+        self._stats.n_backtracks += 1
         n_checked = self._n_checked
         assumed_indices = np.arange(n_checked, self._states.size)[self._assumed[n_checked:]]
         first_assumed_idx, last_assumed_idx, after_assumed_idx = (
@@ -144,8 +308,7 @@ class ProbabilityCalculator:
 
     def _assume_flags(self) -> tuple[bool, bool]:
         assumed = False
-        for idx in self._opened_indices:
-            target_indices = self._target_neighbors[idx]
+        for idx, target_indices in zip(self._constraints, self._constraint_targets):
             ts = self._states[target_indices]
             n_closed = self._n_closed_in_neighbors[idx] + np.count_nonzero(ts != SAFE)
             if n_closed < self._cell_state[idx]:  # contradiction
@@ -153,14 +316,13 @@ class ProbabilityCalculator:
             if self._cell_state[idx] == n_closed:
                 neighbor_none_indices = target_indices[ts == NONE]
                 self._states[neighbor_none_indices] = MINE
-                assumed = neighbor_none_indices.size > 0
+                assumed |= neighbor_none_indices.size > 0
 
         return False, assumed
 
-    def _assume_safe_cells(self) -> Tuple[bool, bool]:
+    def _assume_safe_cells(self) -> tuple[bool, bool]:
         assumed = False
-        for idx in self._opened_indices:
-            target_indices = self._target_neighbors[idx]
+        for idx, target_indices in zip(self._constraints, self._constraint_targets):
             ts = self._states[target_indices]
             n_flags = self._n_flags_in_neighbors[idx] + np.count_nonzero(ts == MINE)
             if n_flags > self._cell_state[idx]:  # contradiction
@@ -168,17 +330,19 @@ class ProbabilityCalculator:
             if n_flags == self._cell_state[idx]:
                 neighbor_none_indices = target_indices[ts == NONE]
                 self._states[neighbor_none_indices] = SAFE
-                assumed = neighbor_none_indices.size > 0
+                assumed |= neighbor_none_indices.size > 0
 
         return False, assumed
 
     def _assume(self) -> bool:
         contradicted, assumed_flags = self._assume_flags()
         if contradicted:
+            self._stats.n_contradictions += 1
             return False
 
         contradicted, assumed_safe_cells = self._assume_safe_cells()
         if contradicted:
+            self._stats.n_contradictions += 1
             return False
 
         if assumed_flags or assumed_safe_cells:
@@ -194,24 +358,285 @@ class ProbabilityCalculator:
 
         return True
 
-    def compute(self) -> Tuple[TargetData, float]:
-        if self._states.size == 0:
-            return self._target, 0.0
+    def _visit(self) -> None:
+        self._stats.n_nodes += 1
+        if self._callback is not None and self._stats.n_nodes % CALLBACK_INTERVAL == 0:
+            self._stats.elapsed = time.time() - self._start_time
+            self._callback(self.stats)
+        if self._max_nodes is not None and self._stats.n_nodes > self._max_nodes:
+            self._stats.elapsed = time.time() - self._start_time
+            raise SearchBudgetExceeded(f"The search exceeded max_nodes={self._max_nodes}")
+        if self._timeout is not None and time.time() - self._start_time > self._timeout:
+            self._stats.elapsed = time.time() - self._start_time
+            raise SearchBudgetExceeded(f"The search exceeded timeout={self._timeout} seconds")
+
+    def _enumerate_array(self, members: np.ndarray, constraints: np.ndarray) -> ComponentCounts:
+        n_targets = members.size
+        rev = {i: j for j, i in enumerate(members)}
+        self._constraints = constraints
+        self._constraint_targets = [
+            np.array([rev[i] for i in self._target_neighbors[idx]], dtype=np.int32) for idx in constraints
+        ]
+        self._states = np.full(n_targets, NONE, dtype=np.int32)
+        self._assumed = np.zeros(n_targets, dtype=np.bool8)
+        self._n_configs = np.zeros(n_targets + 1, dtype=np.float64)
+        self._mine_counts = np.zeros((n_targets + 1, n_targets), dtype=np.float64)
+        self._n_checked = 0
 
-        t = 0
         self._states[0], self._assumed[0] = MINE, True
         while np.any(self._assumed) or NONE in self._states:
-            t += 1
-            if t % 10000 == 0:
-                print(f"{t}: {self._n_checked}")
-
+            self._visit()
             if not self._assume():
                 self._update_target()
                 continue
 
-        proba4land = 1.0
-        if self._total_count != 0:
-            self._target.proba = self._counts / self._total_count
-            proba4land = self._count4land / self._total_count if self._n_land_cells != 0 else 1.0
+        return ComponentCounts(n_configs=self._n_configs, mine_counts=self._mine_counts)
+
+    def _propagate(self, mine: int, safe: int) -> tuple[int, int] | None:
+        undecided = self._full_mask & ~(mine | safe)
+        changed = True
+        while changed:
+            changed = False
+            for mask, need in zip(self._masks, self._needs):
+                n_mines, free = popcount(mine & mask), undecided & mask
+                n_free = popcount(free)
+                if n_mines > need or n_mines + n_free < need:  # contradiction
+                    return None
+                if n_free == 0:
+                    continue
+
+                if n_mines == need:
+                    safe |= free
+                elif n_mines + n_free == need:
+                    mine |= free
+                else:
+                    continue
+
+                undecided &= ~free
+                changed = True
+
+        return mine, safe
+
+    def _flush_leaves(self) -> None:
+        n_targets = self._n_configs.size - 1
+        n_bytes = (n_targets + 7) // 8
+        buffer = b"".join(mine.to_bytes(n_bytes, "little") for mine in self._leaves)
+        bits = np.frombuffer(buffer, dtype=np.uint8).reshape(len(self._leaves), n_bytes)
+        new_mine_flags = np.unpackbits(bits, axis=1, bitorder="little")[:, :n_targets]
+        n_mines = np.count_nonzero(new_mine_flags, axis=1)
+        np.add.at(self._n_configs, n_mines, 1)
+        np.add.at(self._mine_counts, n_mines, new_mine_flags)
+        self._leaves = []
+
+    def _search(self, mine: int, safe: int) -> None:
+        # the assignments to visit, with an explicit stack instead of the recursion for the long components.
+        stack = [(mine, safe, False)]
+        while len(stack) > 0:
+            mine, safe, backtracked = stack.pop()
+            if backtracked:
+                self._stats.n_backtracks += 1
+            self._visit()
+            assignment = self._propagate(mine, safe)
+            if assignment is None:
+                self._stats.n_contradictions += 1
+                continue
+
+            mine, safe = assignment
+            undecided = self._full_mask & ~(mine | safe)
+            if undecided == 0:
+                self._stats.n_leaves += 1
+                self._leaves.append(mine)
+                if len(self._leaves) >= LEAF_BUFFER_SIZE:
+                    self._flush_leaves()
+                continue
+
+            # assume a mine in the first undecided target first and then a safe cell.
+            bit = undecided & -undecided
+            stack.append((mine, safe | bit, True))
+            stack.append((mine | bit, safe, False))
+
+    def _enumerate_bitset(self, members: np.ndarray, constraints: np.ndarray) -> ComponentCounts:
+        n_targets = members.size
+        rev = {i: j for j, i in enumerate(members)}
+        self._masks = [sum(1 << rev[i] for i in self._target_neighbors[idx]) for idx in constraints]
+        self._needs = [int(self._cell_state[idx] - self._n_flags_in_neighbors[idx]) for idx in constraints]
+        self._full_mask = (1 << n_targets) - 1
+        self._n_configs = np.zeros(n_targets + 1, dtype=np.float64)
+        self._mine_counts = np.zeros((n_targets + 1, n_targets), dtype=np.float64)
+        self._leaves = []
+
+        # the cells decided by the pairs of constraints are fixed before the search.
+        assignment = presolve(self._masks, self._needs)
+        if assignment is None:
+            self._stats.n_contradictions += 1
+        else:
+            self._search(*assignment)
+        if len(self._leaves) > 0:
+            self._flush_leaves()
+
+        return ComponentCounts(n_configs=self._n_configs, mine_counts=self._mine_counts)
+
+    def _order(self, members: np.ndarray, constraints: np.ndarray) -> np.ndarray:
+        # the positions in members in the order of the assignments.
+        if self._ordering == "index":
+            return np.arange(members.size)
+
+        rev = {i: j for j, i in enumerate(members)}
+        constraint_targets = [[rev[i] for i in self._target_neighbors[idx]] for idx in constraints]
+        target_constraints: list[list[int]] = [[] for _ in range(members.size)]
+        for c, targets in enumerate(constraint_targets):
+            for j in targets:
+                target_constraints[j].append(c)
+
+        if self._ordering == "frontier":
+            order, visited, q = [0], {0}, deque([0])
+            while len(q) > 0:
+                for c in target_constraints[q.popleft()]:
+                    new_targets = [j for j in constraint_targets[c] if j not in visited]
+                    visited.update(new_targets)
+                    order.extend(new_targets)
+                    q.extend(new_targets)
+
+            return np.asarray(order)
+
+        n_unordered = [len(targets) for targets in constraint_targets]
+
+        def priority(j: int) -> tuple[int, int, int]:
+            # the target in the constraint closest to be closed, preferring the targets in more constraints.
+            return min([n_unordered[c] for c in target_constraints[j]], default=0), -len(target_constraints[j]), j
+
+        unordered, order = set(range(members.size)), []
+        while len(unordered) > 0:
+            best = min(unordered, key=priority)
+            unordered.remove(best)
+            order.append(best)
+            for c in target_constraints[best]:
+                n_unordered[c] -= 1
+
+        return np.asarray(order)
+
+    def _enumerate(self, members: np.ndarray, constraints: np.ndarray) -> ComponentCounts:
+        order = self._order(members, constraints)
+        if self._representation == "bitset":
+            counts = self._enumerate_bitset(members[order], constraints)
+        else:
+            counts = self._enumerate_array(members[order], constraints)
+
+        # the counts are returned in the order of members.
+        mine_counts = np.empty_like(counts.mine_counts)
+        mine_counts[:, order] = counts.mine_counts
+        return ComponentCounts(n_configs=counts.n_configs, mine_counts=mine_counts)
+
+    def _combine(self, counts: list[ComponentCounts]) -> float:
+        # each component and each partial convolution is rescaled on its own, since the scales cancel out
+        # in the ratios below. this keeps the counts in the float64 range even on huge fields.
+        counts = [
+            ComponentCounts(n_configs=scaled[:, -1], mine_counts=scaled[:, :-1])
+            for scaled in (_rescale(np.column_stack([c.mine_counts, c.n_configs])) for c in counts)
+        ]
+        # convolve the histograms of the other components to weight each number of mines in a component.
+        n_configs = [c.n_configs for c in counts]
+        prefix, suffix = [np.ones(1)], [np.ones(1)]
+        for i in range(len(counts) - 1):
+            prefix.append(_rescale(np.convolve(prefix[-1], n_configs[i])))
+            suffix.append(_rescale(np.convolve(suffix[-1], n_configs[-i - 1])))
+
+        n_remaining_mines = self._n_mines - self._n_flags
+        total_n_configs = np.convolve(prefix[-1], n_configs[-1])
+        n_land_mines = n_remaining_mines - np.arange(total_n_configs.size)
+        land_counts = _land_counts(self._n_land_cells, n_land_mines)
+        total_count = total_n_configs @ land_counts
+        if total_count == 0:  # contradiction
+            return 1.0
+
+        for (members, _), c, p, s in zip(self._components, counts, prefix, suffix[::-1]):
+            weights = np.correlate(land_counts, np.convolve(p, s), mode="valid")
+            # reduce the cells and the component total in the same way, so that sure mines get exactly 1.0.
+            weighted = np.sum(weights[:, np.newaxis] * np.column_stack([c.mine_counts, c.n_configs]), axis=0)
+            self._target.proba[members] = weighted[:-1] / weighted[-1]
+
+        if self._n_land_cells == 0:
+            return 1.0
+
+        # C(L - 1, m - 1) = C(L, m) * m / L gives the number of ways where a given land cell has a mine.
+        count4land = total_n_configs @ (land_counts * n_land_mines)
+        return count4land / (total_count * self._n_land_cells)
+
+    def _signature(self, members: np.ndarray, constraints: np.ndarray) -> tuple[bytes, np.ndarray]:
+        # the enumeration only depends on the locations of the targets and the number of mines each constraint needs.
+        cells = np.concatenate([self._target.index[members], constraints])
+        locs = np.column_stack(np.divmod(cells, self._width))
+        needs = self._cell_state[constraints] - self._n_flags_in_neighbors[constraints]
+        signature, order = canonicalize(locs, np.concatenate([np.full(members.size, -1), needs]))
+        return signature, order[order < members.size]
+
+    def _get_counts(self, members: np.ndarray, constraints: np.ndarray) -> ComponentCounts:
+        key = tuple(self._target.index[members].tolist())
+        changed = np.any(self._dirty[self._target.index[members]]) or np.any(self._dirty[constraints])
+        if key in self._cached_counts and not changed:
+            self._stats.n_reused += 1
+            return self._cached_counts[key]
+        if self._cache is None:
+            return self._enumerate(members, constraints)
+
+        # the cache keeps the targets in the canonical order.
+        signature, order = self._signature(members, constraints)
+        cached = self._cache.get(signature)
+        if cached is not None:
+            self._stats.n_cached += 1
+            mine_counts = np.empty_like(cached.mine_counts)
+            mine_counts[:, order] = cached.mine_counts
+            return ComponentCounts(n_configs=cached.n_configs, mine_counts=mine_counts)
+
+        counts = self._enumerate(members, constraints)
+        canonical = ComponentCounts(n_configs=counts.n_configs, mine_counts=counts.mine_counts[:, order])
+        self._cache.put(signature, canonical)
+        return counts
+
+    def compute(self) -> tuple[TargetData, float]:
+        self._stats = SearchStats(n_components=len(self._components), ordering=self._ordering)
+        self._start_time = time.time()
+        proba4land = 0.0
+        if self._target.index.size > 0:
+            counts = [self._get_counts(members, constraints) for members, constraints in self._components]
+            # keep only the current components as the others will never be reused.
+            self._cached_counts = {
+                tuple(self._target.index[members].tolist()): c for (members, _), c in zip(self._components, counts)
+            }
+            self._dirty = np.zeros(self._n_cells, dtype=np.bool8)
+            proba4land = self._combine(counts)
+        elif self._n_land_cells > 0:
+            # no constraint is left, so that the remaining mines are spread over the land cells evenly.
+            proba4land = (self._n_mines - self._n_flags) / self._n_land_cells
+
+        self._stats.elapsed = time.time() - self._start_time
+        if self._callback is not None:
+            self._callback(self.stats)
+
+        return self._target, proba4land
+
+    def _compute_by_cpp(self) -> tuple[TargetData, float]:
+        """
+        Compute the probabilities by the C++ solver instead of the search.
+        The C++ solver enumerates the whole field in one call and finds the mines by itself,
+        so the flags only decide the targets reported in TargetData.
+        The width of the field must be given, and the search budgets and the cache are not used.
+        """
+        import mine_sweeper_solver
+
+        if self._width is None:
+            raise ValueError("width must be given to use the C++ solver")
+
+        self._stats = SearchStats(n_components=len(self._components), ordering=self._ordering)
+        self._start_time = time.time()
+        probs = mine_sweeper_solver.calculate_probability(
+            self._cell_state.reshape(-1, self._width), self._n_mines, ordering=self._ordering
+        ).ravel()
+        self._target.proba[:] = probs[self._target.index]
+        proba4land = float(probs[np.argmax(self._is_land)]) if self._n_land_cells > 0 else 1.0
+
+        self._stats.elapsed = time.time() - self._start_time
+        if self._callback is not None:
+            self._callback(self.stats)
 
         return self._target, proba4land
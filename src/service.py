@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from concurrent.futures import Executor
+from typing import Any
+
+import numpy as np
+
+from src.constants import TargetData
+from src.engine import get_engine
+from src.topology import Topology, get_topology
+from src.transposition import TranspositionCache
+
+
+# the maximum length of a request line in bytes, which is far longer than the default of asyncio for the large fields.
+STREAM_LIMIT = 2**26
+# the tolerance of the expected numbers of mines in the check of the probabilities.
+TOLERANCE = 1e-6
+
+
+def _check_probabilities(
+    cell_state: np.ndarray, flags: np.ndarray, n_mines: int, topology: Topology, target: TargetData, p_land: float
+) -> None:
+    # the probabilities give the expected number of mines around each opened cell and in the field,
+    # which equal the number of the cell and n_mines exactly if the field has a valid configuration.
+    # otherwise, the engines give the probabilities of no configuration, e.g. zeros, which break either of them.
+    proba = np.where(flags, 1.0, 0.0)
+    proba[(cell_state == -1) & ~flags] = p_land
+    proba[target.index] = target.proba
+    if np.any((proba < -TOLERANCE) | (proba > 1 + TOLERANCE)) or not np.isclose(proba.sum(), n_mines):
+        raise ValueError("no configuration of n_mines mines matches cell_state")
+
+    opened = np.flatnonzero(cell_state >= 0)
+    # the table of the topology is padded by one sentinel cell without a mine.
+    expected = np.append(proba, 0.0)[topology.table[opened]].sum(axis=1)
+    if not np.allclose(expected, cell_state[opened], rtol=0.0, atol=TOLERANCE):
+        raise ValueError("no configuration of n_mines mines matches cell_state")
+
+
+class ProbabilityService:
+    """
+    The probability computation of the requests of the service.
+    The topology of each shape and the enumeration results are kept over the requests,
+    so that the repeated and the similar board states are answered without the setup.
+
+    Args:
+        engine (str):
+            The engine used if a request does not choose one.
+        cache_size (int):
+            The maximum number of patterns in the transposition cache.
+    """
+
+    def __init__(self, engine: str = "auto", cache_size: int = 4096):
+        self._engine = engine
+        self._cache = TranspositionCache(maxsize=cache_size)
+
+    @property
+    def cache(self) -> TranspositionCache:
+        return self._cache
+
+    def compute(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Compute the probabilities of a board state.
+
+        Args:
+            request (dict[str, Any]):
+                The request with the following keys.
+                - cell_state: the state of each cell with the shape of (height, width).
+                - n_mines: the number of mines in the field.
+                - flags (optional): the cells known to have a mine with the same shape as cell_state.
+                - engine (optional): the name of the engine.
+                - id (optional): any value returned with the response.
+
+        Returns:
+            response (dict[str, Any]):
+                The response with id, the indices of the targets, their probabilities, the probability for
+                the land cells and the time of the computation, or with id and error if the request is invalid.
+        """
+        try:
+            cell_state = np.asarray(request["cell_state"], dtype=np.int64)
+            if cell_state.ndim != 2 or cell_state.size == 0:
+                raise ValueError("cell_state must be a non-empty 2D array")
+            if np.any((cell_state < -1) | (cell_state > 8)):
+                raise ValueError("cell_state must be in [-1, 8]")
+
+            height, width = cell_state.shape
+            flags = np.asarray(request.get("flags", np.zeros_like(cell_state)), dtype=np.bool8)
+            if flags.shape != cell_state.shape:
+                raise ValueError("flags must have the same shape as cell_state")
+            if np.any(flags & (cell_state != -1)):
+                raise ValueError("flags must be on the closed cells")
+
+            n_mines = request["n_mines"]
+            if not isinstance(n_mines, int) or isinstance(n_mines, bool):
+                raise TypeError(f"n_mines must be an integer, but got {n_mines!r}")
+            if not 0 <= n_mines <= cell_state.size:
+                raise ValueError(f"n_mines must be in [0, {cell_state.size}], but got {n_mines}")
+
+            topology = get_topology(height, width)
+            prob = get_engine(request.get("engine", self._engine))(
+                cell_state=cell_state.ravel(),
+                flags=flags.ravel(),
+                neighbors=topology.neighbors,
+                n_mines=n_mines,
+                cache=self._cache,
+                width=width,
+            )
+            target, p_land = prob.compute()
+            _check_probabilities(cell_state.ravel(), flags.ravel(), n_mines, topology, target, p_land)
+        except Exception as e:
+            # any failure only answers its own request, so that the other requests of the batch are answered.
+            return dict(id=request.get("id"), error=f"{type(e).__name__}: {e}")
+
+        return dict(
+            id=request.get("id"),
+            index=target.index.tolist(),
+            proba=target.proba.tolist(),
+            p_land=float(p_land),
+            elapsed=prob.stats.elapsed,
+        )
+
+
+# the service of each worker process, which stays warm over the batches.
+_SERVICE: ProbabilityService | None = None
+
+
+def init_worker(engine: str = "auto", cache_size: int = 4096) -> ProbabilityService:
+    global _SERVICE
+    _SERVICE = ProbabilityService(engine=engine, cache_size=cache_size)
+    return _SERVICE
+
+
+def compute_batch(requests: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # one batch is sent to a worker at once, so that the requests share one round trip.
+    service = init_worker() if _SERVICE is None else _SERVICE
+    return [service.compute(request) for request in requests]
+
+
+async def serve_stream(
+    reader: asyncio.StreamReader, writer: Any, executor: Executor, n_workers: int = 1, max_batch: int = 64
+) -> None:
+    """
+    Answer the JSON lines of a stream until it ends.
+    The requests that arrive together are split into at most n_workers batches, which are computed concurrently
+    by the executor. The responses are written as soon as each batch finishes, so that they may be out of order.
+    A line longer than the limit of the reader is skipped with an error response, so the reader of the large fields
+    should be created with STREAM_LIMIT.
+
+    Args:
+        reader (asyncio.StreamReader):
+            The stream of the requests.
+        writer (Any):
+            The stream of the responses, which has write and drain as asyncio.StreamWriter.
+        executor (Executor):
+            The pool of the workers running compute_batch.
+        n_workers (int):
+            The number of the workers in the executor.
+        max_batch (int):
+            The maximum number of requests taken at once.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+
+    async def respond(responses: list[dict[str, Any]]) -> None:
+        writer.write(b"".join(json.dumps(response).encode() + b"\n" for response in responses))
+        await writer.drain()
+
+    async def run(batch: list[dict[str, Any]]) -> None:
+        try:
+            responses = await loop.run_in_executor(executor, compute_batch, batch)
+        except Exception as e:
+            # e.g. a worker process died, so that the other batches can still be answered.
+            responses = [dict(id=request.get("id"), error=f"{type(e).__name__}: {e}") for request in batch]
+
+        await respond(responses)
+
+    async def readline() -> bytes | None:
+        # the next line, b"" at the end of the stream or None for a line longer than the limit.
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            overrun = e
+
+        # the long line is dropped up to its end, so that its rest is not taken as another request.
+        while True:
+            await reader.readexactly(overrun.consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.IncompleteReadError:
+                return None
+            except asyncio.LimitOverrunError as e:
+                overrun = e
+
+    async def read() -> None:
+        try:
+            while (line := await readline()) != b"":
+                if line is None:
+                    await respond([dict(id=None, error="ValueError: the request is longer than the limit")])
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request must be a JSON object")
+                except ValueError as e:
+                    await respond([dict(id=None, error=f"{type(e).__name__}: {e}")])
+                    continue
+
+                await queue.put(request)
+        finally:
+            # the requests already read are answered even if the stream breaks.
+            await queue.put(None)
+
+    reading = asyncio.create_task(read())
+    tasks: set[asyncio.Task] = set()
+    finished = False
+    while not finished:
+        items = [await queue.get()]
+        # the requests already waiting join the batch without delaying the first one.
+        while len(items) < max_batch and not queue.empty():
+            items.append(queue.get_nowait())
+
+        # the end of the stream is the last item.
+        finished = items[-1] is None
+        requests = [request for request in items if request is not None]
+
+        n_batches = min(n_workers, len(requests))
+        for i in range(n_batches):
+            task = asyncio.create_task(run(requests[i::n_batches]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    await asyncio.gather(*tasks)
+    # the error of the stream, if any, is raised after the requests read before it are answered.
+    await reading
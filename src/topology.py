@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from src.constants import DIRS
+
+# the number of shapes kept by get_topology, so that a long-running service does not grow with every new shape.
+TOPOLOGY_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class Topology:
+    """
+    The neighbor structure of a field, which depends only on the shape of the field.
+    The arrays are read-only, so that one instance can be shared by all the fields of the same shape.
+
+    Attributes:
+        height (int):
+            The height of the field.
+        width (int):
+            The width of the field.
+        neighbors (tuple[np.ndarray, ...]):
+            The indices of neighbors in each cell.
+            Each array is a view of one flat array, so the table does not hold a separate buffer per cell.
+        table (np.ndarray):
+            The indices of neighbors in each cell with the shape of (n_cells, 8).
+            The missing neighbors are filled by n_cells, so arrays indexed by this table
+            must be padded with one sentinel value at the end.
+    """
+
+    height: int
+    width: int
+    neighbors: tuple[np.ndarray, ...]
+    table: np.ndarray
+
+    @property
+    def n_cells(self) -> int:
+        return self.height * self.width
+
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def get_topology(height: int, width: int) -> Topology:
+    n_cells = height * width
+    locs = np.stack(np.divmod(np.arange(n_cells), width), axis=-1)[:, None, :] + DIRS
+    ys, xs = locs[..., 0], locs[..., 1]
+    valid = (0 <= ys) & (ys < height) & (0 <= xs) & (xs < width)
+    table = np.where(valid, ys * width + xs, n_cells)
+
+    # the valid entries keep the order of DIRS in each row.
+    flat = table[valid]
+    flat.flags.writeable = False
+    neighbors = tuple(np.split(flat, np.cumsum(np.count_nonzero(valid, axis=1))[:-1]))
+    # move the sentinels to the end of each row.
+    table = np.take_along_axis(table, np.argsort(~valid, axis=1, kind="stable"), axis=1).astype(np.int32)
+    table.flags.writeable = False
+    return Topology(height=height, width=width, neighbors=neighbors, table=table)
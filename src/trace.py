@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import os
+from enum import IntEnum
+from itertools import islice
+from typing import Any, Iterator
+
+import numpy as np
+
+from src.mine_sweeper import MineSweeper
+
+
+# the magic bytes at the head of each trace file.
+MAGIC = b"MSTRACE1"
+# each record is packed into 17 bytes, so that a file can be memory-mapped as an array of records.
+RECORD_DTYPE = np.dtype(
+    [("kind", "u1"), ("cell", "<i4"), ("value", "<i4"), ("proba", "<f4"), ("elapsed", "<f4")], align=False
+)
+
+
+class RecordKinds(IntEnum):
+    """
+    Attributes:
+        game (int):
+            The head of a game. cell is the height and value is the width of the field.
+        seed (int):
+            Follows the head of a game. cell is the seed (-1 if not given) and value is the number of mines.
+        open (int):
+            A cell opened by the player. value is 1 for a guess and 0 for a deduction,
+            proba is the probability of a mine and elapsed is the time of the probability computation.
+            The first open of a game is the first cell.
+        flag (int):
+            A cell flagged by the player.
+        end (int):
+            The end of a game. value is 1 for clear and 0 for game over and elapsed is the time of the game.
+        move (int):
+            Precedes the cells opened at once by a move. cell is the number of the cells.
+    """
+
+    game = 0
+    seed = 1
+    open = 2
+    flag = 3
+    end = 4
+    move = 5
+
+
+class TraceRecorder:
+    """
+    The recorder of the moves of the games into an append-only binary file.
+    The records of each game are kept in memory and appended to the file by one write at the end of the game,
+    so that the games recorded by many processes into the same file do not interleave.
+
+    Args:
+        path (str):
+            The path of the trace file. The records are appended if it already exists.
+    """
+
+    def __init__(self, path: str):
+        """
+        Attributes:
+            records (list[tuple[int, int, int, float, float]]):
+                The records of the game being recorded.
+            move (tuple[int, float, float]):
+                The guess flag, the probability and the elapsed time given to the next opened cells.
+        """
+        self._path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        else:
+            # the records are not appended to the other files.
+            with open(path, "rb") as f:
+                magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError(f"{path} is not a trace file")
+
+        self._records: list[tuple[int, int, int, float, float]] = []
+        self._move = (0, 0.0, 0.0)
+
+    def __enter__(self) -> TraceRecorder:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def begin(self, height: int, width: int, n_mines: int, seed: int | None) -> None:
+        # the seed is kept in the 32-bit field of a record, where -1 means no seed.
+        if seed is not None and not 0 <= seed < 2**31:
+            raise ValueError(f"seed must be in [0, {2**31 - 1}] to be recorded, but got {seed}")
+
+        self._records = [
+            (RecordKinds.game, height, width, 0.0, 0.0),
+            (RecordKinds.seed, -1 if seed is None else seed, n_mines, 0.0, 0.0),
+        ]
+        self._move = (0, 0.0, 0.0)
+
+    def note_move(self, guess: bool, proba: float, elapsed: float) -> None:
+        # the next opened cells are recorded with this information.
+        self._move = (int(guess), proba, elapsed)
+
+    def record_open(self, indices: np.ndarray) -> None:
+        guess, proba, elapsed = self._move
+        self._records.append((RecordKinds.move, len(indices), 0, 0.0, 0.0))
+        self._records.extend((RecordKinds.open, int(idx), guess, proba, elapsed) for idx in indices)
+        self._move = (0, 0.0, 0.0)
+
+    def record_flags(self, indices: np.ndarray) -> None:
+        self._records.extend((RecordKinds.flag, int(idx), 0, 1.0, 0.0) for idx in indices)
+
+    def end(self, clear: bool, elapsed: float) -> None:
+        self._records.append((RecordKinds.end, -1, int(clear), 0.0, elapsed))
+        self._file.write(np.array(self._records, dtype=RECORD_DTYPE).tobytes())
+        self._file.flush()
+        self._records = []
+
+
+class TraceReader:
+    """
+    The reader of the trace files, which memory-maps the records instead of loading them.
+
+    Args:
+        path (str):
+            The path of the trace file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Attributes:
+            records (np.ndarray):
+                The memory-mapped records of all the games.
+            game_starts (np.ndarray):
+                The index of the head record of each game.
+            game_ends (np.ndarray):
+                The index after the end record of each game.
+        """
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+
+        n_records = (os.path.getsize(path) - len(MAGIC)) // RECORD_DTYPE.itemsize
+        if n_records == 0:
+            self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        else:
+            self._records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=len(MAGIC), shape=(n_records,))
+
+        self._game_starts = np.flatnonzero(self._records["kind"] == RecordKinds.game)
+        self._game_ends = np.append(self._game_starts[1:], n_records)
+
+    def __len__(self) -> int:
+        return self._game_starts.size
+
+    @property
+    def records(self) -> np.ndarray:
+        return self._records
+
+    @property
+    def games(self) -> np.ndarray:
+        # the game of each record, e.g. records[(games == g) & (records["kind"] == RecordKinds.open)].
+        return np.cumsum(self._records["kind"] == RecordKinds.game) - 1
+
+    def info(self, game: int) -> dict[str, Any]:
+        head = self._records[self._game_starts[game]]
+        seed = self._records[self._game_starts[game] + 1]
+        last = self._records[self._game_ends[game] - 1]
+        finished = last["kind"] == RecordKinds.end
+        return dict(
+            height=int(head["cell"]),
+            width=int(head["value"]),
+            seed=None if seed["cell"] < 0 else int(seed["cell"]),
+            n_mines=int(seed["value"]),
+            clear=bool(last["value"]) if finished else None,
+            elapsed=float(last["elapsed"]) if finished else None,
+        )
+
+    def moves(self, game: int) -> np.ndarray:
+        # the open and flag records of a game in the order of the moves.
+        start, stop = self._game_starts[game] + 2, self._game_ends[game]
+        records = self._records[start:stop]
+        return records[(records["kind"] == RecordKinds.open) | (records["kind"] == RecordKinds.flag)]
+
+    def replay(self, game: int, n_moves: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Replay a game to its state after the given number of moves, which is the state of the same frame.
+
+        Args:
+            game (int):
+                The index of the game in the file.
+            n_moves (int | None):
+                The number of moves to replay, where each move opens one or more cells at once.
+                All the moves if not given.
+
+        Returns:
+            cell_state (np.ndarray):
+                The state of each cell.
+            flags (np.ndarray):
+                The flags put by the player until the next move.
+        """
+        field, flags = self._new_field(game)
+        for _ in islice(self._play(game, field, flags), n_moves):
+            pass
+
+        return field.cell_state, flags.copy()
+
+    def frames(self, game: int) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Replay a game move by move, which costs one replay for all the states unlike replay.
+
+        Args:
+            game (int):
+                The index of the game in the file.
+
+        Yields:
+            cell_state (np.ndarray):
+                The state of each cell after each move.
+            flags (np.ndarray):
+                The flags put by the player until the next move.
+        """
+        field, flags = self._new_field(game)
+        for _ in self._play(game, field, flags):
+            yield field.cell_state, flags.copy()
+
+    def _play(self, game: int, field: MineSweeper, flags: np.ndarray) -> Iterator[None]:
+        # make the moves of a game on the field one by one and stop after each move.
+        start, stop = self._game_starts[game] + 2, self._game_ends[game]
+        records = self._records[start:stop]
+        # the flags are recorded before the move record of the next move, so that each state ends at a move record.
+        ends = np.append(np.flatnonzero(records["kind"] == RecordKinds.move)[1:], records.size)
+        begin, started = 0, False
+        for end in ends:
+            moves = records[begin:end]
+            begin = end
+            flags[moves["cell"][moves["kind"] == RecordKinds.flag]] = True
+            opened = moves["cell"][moves["kind"] == RecordKinds.open].astype(np.int64)
+            if opened.size == 0:
+                continue
+            if not started:
+                field.start(int(opened[0]))
+                opened, started = opened[1:], True
+            if opened.size > 0:
+                field.open_multiple(opened)
+
+            yield
+
+    def _new_field(self, game: int) -> tuple[MineSweeper, np.ndarray]:
+        info = self.info(game)
+        if info["seed"] is None:
+            raise ValueError("the game without seed cannot be replayed")
+
+        shape = (info["height"], info["width"], info["n_mines"])
+        field = MineSweeper(seed=info["seed"], plot_field=False, shape=shape, quiet=True)
+        return field, np.zeros(info["height"] * info["width"], dtype=np.bool8)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import numpy as np
+
+from src.constants import ComponentCounts
+
+
+# the rotations and the reflections of a square as the matrices applied to (y, x).
+SYMMETRIES = np.asarray(
+    [
+        [[1, 0], [0, 1]],
+        [[0, 1], [-1, 0]],
+        [[-1, 0], [0, -1]],
+        [[0, -1], [1, 0]],
+        [[1, 0], [0, -1]],
+        [[-1, 0], [0, 1]],
+        [[0, 1], [1, 0]],
+        [[0, -1], [-1, 0]],
+    ]
+)
+
+
+def canonicalize(locs: np.ndarray, values: np.ndarray) -> tuple[bytes, np.ndarray]:
+    """
+    Compute the signature of a pattern of cells that does not change by translations, rotations and reflections.
+
+    Args:
+        locs (np.ndarray):
+            The (y, x) of each cell with the shape of (n_cells, 2).
+        values (np.ndarray):
+            The value of each cell.
+
+    Returns:
+        signature (bytes):
+            The smallest encoding of the pattern among all the symmetries.
+        order (np.ndarray):
+            The indices of the cells in the order of the canonical pattern.
+    """
+    best_signature, best_order = b"", np.arange(0)
+    for symmetry in SYMMETRIES:
+        transformed = locs @ symmetry
+        transformed -= np.min(transformed, axis=0)
+        order = np.lexsort((transformed[:, 1], transformed[:, 0]))
+        signature = np.column_stack([transformed[order], values[order]]).astype(np.int32).tobytes()
+        if best_order.size == 0 or signature < best_signature:
+            best_signature, best_order = signature, order
+
+    return best_signature, best_order
+
+
+class TranspositionCache:
+    """
+    The LRU cache of the enumeration results of the components keyed by their canonical patterns.
+    The results do not depend on the field, so that one cache can be shared by many games.
+
+    Args:
+        maxsize (int):
+            The maximum number of patterns in the cache.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Attributes:
+            data (OrderedDict[bytes, ComponentCounts]):
+                The counts of each pattern with the targets in the canonical order.
+                The least recently used pattern comes first.
+            n_hits (int):
+                The number of lookups that found the pattern.
+            n_misses (int):
+                The number of lookups that did not find the pattern.
+        """
+        self._maxsize = maxsize
+        self._data: OrderedDict[bytes, ComponentCounts] = OrderedDict()
+        self._n_hits = 0
+        self._n_misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def n_hits(self) -> int:
+        return self._n_hits
+
+    @property
+    def n_misses(self) -> int:
+        return self._n_misses
+
+    def get(self, signature: bytes) -> ComponentCounts | None:
+        counts = self._data.get(signature)
+        if counts is None:
+            self._n_misses += 1
+            return None
+
+        self._n_hits += 1
+        self._data.move_to_end(signature)
+        return counts
+
+    def put(self, signature: bytes, counts: ComponentCounts) -> None:
+        self._data[signature] = counts
+        self._data.move_to_end(signature)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
@@ -1,62 +1,304 @@
 from __future__ import annotations
 
 import os
-
-import matplotlib.pyplot as plt
+from multiprocessing import Pool
+from typing import TYPE_CHECKING, Sequence
 
 import numpy as np
 
-from src.mine_sweeper import MineSweeper
-from src.probability import ProbabilityCalculator
-
-
-def visualize(cell_state: np.ndarray, flags: np.ndarray, identifier: int | None = None) -> None:
-    size = cell_state.size
-    difficulty = {81: 0, 256: 1, 480: 2}[size]
-    ms = MineSweeper(difficulty=difficulty)
-
-    prob = ProbabilityCalculator(
-        cell_state=cell_state,
-        flags=flags,
-        neighbors=ms.neighbors,
-        n_mines=ms.n_mines,
-    )
-    target = prob.compute()[0]
-
-    W, H = ms.width, ms.height
-
-    _, ax = plt.subplots(figsize=(5 * W / 8, 5 * H / 8))
-    ax.tick_params(labelbottom=False, bottom=False, labelleft=False, left=False)
-    ax.vlines(np.arange(W + 1), 0, H, colors="black")
-    ax.hlines(np.arange(H + 1), 0, W, colors="black")
-    ax.set_xlim(0, W)
-    ax.set_ylim(0, H)
-
-    COLORS_OF_NUMBERS = ["white", "blue", "green", "red", "purple", "black", "gray", "darkred", "cyan"]
-
-    for idx, (state, flag) in enumerate(zip(cell_state, flags)):
-        y, x = idx // W, idx % W
-        if state == -1:
-            ax.fill_between([x, x + 1], H - y - 1, H - y, color="cyan")
-            if flag:
-                kwargs = dict(color="orange", ha="center", va="center", weight="bold")
-                ax.text(x + 0.5, H - y - 0.5, "P", fontsize=15, **kwargs)
-        elif state == -2:
-            ax.fill_between([x, x + 1], H - y - 1, H - y, color="darkred")
-            kwargs = dict(ha="center", va="center", weight="bold")
-            ax.text(x + 0.5, H - y - 0.5, "X", color="white", fontsize=15, **kwargs)
+from src.constants import TargetData
+from src.engine import get_engine
+from src.topology import get_topology
+from src.trace import TraceReader
+from src.transposition import TranspositionCache
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+    from PIL import Image
+
+
+COLORS_OF_NUMBERS = ["white", "blue", "green", "red", "purple", "black", "gray", "darkred", "cyan"]
+# the colors of the closed cells, the opened cells and the exploded mines in RGB.
+COLORS_OF_CELLS = {-1: (0.0, 1.0, 1.0), 0: (1.0, 1.0, 1.0), -2: (0.545, 0.0, 0.0)}
+# the height, the width and the number of mines of each difficulty by the number of cells.
+SHAPES = {81: (9, 9, 10), 256: (16, 16, 40), 480: (16, 30, 100)}
+
+
+class FrameRenderer:
+    """
+    The renderer of the frames of a field, which builds the figure once and reuses it for every frame.
+
+    The figure without the colors and the texts of the cells is drawn once as the template.
+    Each frame paints the pixels of the changed cells from the template with their colors and draws their texts
+    into the buffer of the canvas, so that the other cells keep the pixels of the previous frame.
+    The frames are cropped to the tight bounding box of the figure as savefig with bbox_inches="tight".
+
+    Args:
+        height (int):
+            The height of the field.
+        width (int):
+            The width of the field.
+    """
+
+    def __init__(self, height: int, width: int):
+        """
+        Attributes:
+            figure (matplotlib.figure.Figure):
+                The figure drawn on the Agg canvas without pyplot.
+            canvas (matplotlib.backends.backend_agg.FigureCanvasAgg):
+                The canvas of the figure, whose buffer holds the rendered frame.
+            image (matplotlib.image.AxesImage):
+                The colors of the cells for the figure drawn as a whole, e.g. by savefig.
+            texts (list[matplotlib.text.Text]):
+                The text artist of each cell.
+            labels (list[tuple | None]):
+                The text, the color, the font size and the weight shown by each text artist.
+            template (np.ndarray):
+                The RGB of the figure with the white cells and without the texts in [0, 1].
+            rows (np.ndarray):
+                The first and the last rows of the pixels of each row of the cells in the buffer.
+            cols (np.ndarray):
+                The first and the last columns of the pixels of each column of the cells in the buffer.
+            rendered (list[tuple | None]):
+                The color and the label of each cell in the buffer.
+            crop (tuple[slice, slice]):
+                The tight bounding box of the figure in the buffer.
+        """
+        # matplotlib is only needed for the plots, so that it is not loaded by importing this module.
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self._H, self._W = height, width
+        self._figure = Figure(figsize=(5 * width / 8, 5 * height / 8))
+        self._canvas = canvas = FigureCanvasAgg(self._figure)
+        self._ax = ax = self._figure.add_subplot()
+        ax.tick_params(labelbottom=False, bottom=False, labelleft=False, left=False)
+        self._colors = np.ones((height, width, 3))
+        self._image = ax.imshow(
+            self._colors, extent=(0, width, 0, height), aspect="auto", interpolation="nearest", zorder=1
+        )
+        ax.vlines(np.arange(width + 1), 0, height, colors="black", zorder=2)
+        ax.hlines(np.arange(height + 1), 0, width, colors="black", zorder=2)
+        ax.set_xlim(0, width)
+        ax.set_ylim(0, height)
+        ax.set_xlabel("NOTE: the numbers in cyan cells show the percentage of having a mine.", fontsize=16)
+        self._texts = [
+            ax.text(idx % width + 0.5, height - idx // width - 0.5, "", ha="center", va="center", visible=False)
+            for idx in range(height * width)
+        ]
+        self._labels: list[tuple | None] = [None] * (height * width)
+
+        canvas.draw()
+        buffer = np.asarray(canvas.buffer_rgba())
+        self._template = buffer[..., :3] / 255.0
+        # each pixel belongs to the cell that has its center, so that the pixels of the cells do not overlap.
+        xs = ax.transData.transform(np.column_stack([np.arange(width + 1), np.zeros(width + 1)]))[:, 0]
+        ys = ax.transData.transform(np.column_stack([np.zeros(height + 1), np.arange(height, -1, -1)]))[:, 1]
+        self._cols = np.ceil(xs - 0.5).astype(np.int64)
+        self._rows = np.ceil(buffer.shape[0] - ys - 0.5).astype(np.int64)
+        self._rendered: list[tuple | None] = [(COLORS_OF_CELLS[0], None)] * (height * width)
+
+        bbox = self._figure.get_tightbbox(canvas.get_renderer()).padded(0.1)
+        dpi = self._figure.dpi
+        top = int(buffer.shape[0] - np.ceil(bbox.y1 * dpi))
+        self._crop = (
+            slice(max(top, 0), int(buffer.shape[0] - np.floor(bbox.y0 * dpi))),
+            slice(max(int(np.floor(bbox.x0 * dpi)), 0), int(np.ceil(bbox.x1 * dpi))),
+        )
+
+    @property
+    def figure(self) -> Figure:
+        return self._figure
+
+    def _cells(self, cell_state: np.ndarray, flags: np.ndarray, target: TargetData | None) -> list[tuple]:
+        # the color and the label of each cell.
+        probas: list[float | None] = [None] * cell_state.size
+        if target is not None:
+            for idx, proba in zip(target.index.tolist(), target.proba.tolist()):
+                probas[idx] = proba
+
+        cells = []
+        for state, flag, proba in zip(cell_state.tolist(), flags.tolist(), probas):
+            label: tuple[str, str, int, str] | None
+            if state == -1 and flag:
+                label = ("P", "orange", 15, "bold")
+            elif state == -1:
+                label = None if proba is None else (f"{int(proba * 100)}", "black", 10, "normal")
+            elif state == -2:
+                label = ("X", "white", 15, "bold")
+            else:
+                label = (f"{state}", COLORS_OF_NUMBERS[state], 10, "normal")
+            cells.append((COLORS_OF_CELLS.get(state, COLORS_OF_CELLS[0]), label))
+
+        return cells
+
+    def draw(self, cell_state: np.ndarray, flags: np.ndarray, target: TargetData | None = None) -> None:
+        """
+        Update the artists of the figure to a state of the field.
+
+        Args:
+            cell_state (np.ndarray):
+                The state of each cell.
+            flags (np.ndarray):
+                The flags put by the player.
+            target (TargetData | None):
+                The probabilities shown in the closed cells.
+        """
+        self._update(self._cells(cell_state, flags, target))
+
+    def _update(self, cells: list[tuple]) -> None:
+        self._colors[...] = np.asarray([color for color, _ in cells]).reshape(self._H, self._W, 3)
+        self._image.set_data(self._colors)
+        for idx, (_, label) in enumerate(cells):
+            if label == self._labels[idx]:
+                continue
+
+            self._labels[idx] = label
+            text = self._texts[idx]
+            text.set_visible(label is not None)
+            if label is not None:
+                text.set_text(label[0])
+                text.set_color(label[1])
+                text.set_fontsize(label[2])
+                text.set_fontweight(label[3])
+
+    def render(self, cell_state: np.ndarray, flags: np.ndarray, target: TargetData | None = None) -> np.ndarray:
+        """
+        Draw a state of the field into an image.
+
+        Returns:
+            image (np.ndarray):
+                The RGB image of the figure cropped to its tight bounding box.
+        """
+        cells = self._cells(cell_state, flags, target)
+        self._update(cells)
+        buffer = np.asarray(self._canvas.buffer_rgba())
+        for idx, cell in enumerate(cells):
+            if cell == self._rendered[idx]:
+                continue
+
+            self._rendered[idx] = cell
+            y, x = divmod(idx, self._W)
+            rows, cols = slice(self._rows[y], self._rows[y + 1]), slice(self._cols[x], self._cols[x + 1])
+            # the grid lines are black, so that the template times the color blends them with the color.
+            buffer[rows, cols, :3] = np.rint(self._template[rows, cols] * np.asarray(cell[0]) * 255)
+            if cell[1] is not None:
+                self._ax.draw_artist(self._texts[idx])
+
+        return buffer[self._crop][..., :3].copy()
+
+
+def compute_targets(
+    frames: Sequence[tuple[np.ndarray, np.ndarray]], height: int, width: int, n_mines: int, engine: str = "auto"
+) -> list[TargetData | None]:
+    """
+    Compute the probabilities of the frames of a game in order.
+    One calculator is updated over the frames, so that the components that the moves do not touch are reused.
+
+    Returns:
+        targets (list[TargetData | None]):
+            The probabilities of each frame, or None if the game is over in the frame.
+    """
+    targets: list[TargetData | None] = []
+    prob = None
+    cache = TranspositionCache()
+    for cell_state, flags in frames:
+        if np.any(cell_state == -2) or not np.any((cell_state == -1) & ~flags):
+            targets.append(None)
+            continue
+
+        if prob is None:
+            prob = get_engine(engine)(
+                cell_state=cell_state,
+                flags=flags,
+                neighbors=get_topology(height, width).neighbors,
+                n_mines=n_mines,
+                cache=cache,
+                width=width,
+            )
         else:
-            color = COLORS_OF_NUMBERS[state]
-            ax.text(x + 0.5, H - y - 0.5, f"{state}", color=color, ha="center", va="center")
+            prob.update(cell_state=cell_state, flags=flags)
+
+        target = prob.compute()[0]
+        # the calculator may overwrite its target in the next computation.
+        targets.append(TargetData(index=target.index.copy(), proba=target.proba.copy()))
+
+    return targets
+
+
+# the renderer of each worker process, which is built by the first frame of each shape.
+_RENDERERS: dict[tuple[int, int], FrameRenderer] = {}
+
+
+def _render_frame(args: tuple[int, int, np.ndarray, np.ndarray, TargetData | None]) -> Image.Image:
+    from PIL import Image
+
+    height, width, cell_state, flags, target = args
+    if (height, width) not in _RENDERERS:
+        _RENDERERS[(height, width)] = FrameRenderer(height, width)
+
+    image = _RENDERERS[(height, width)].render(cell_state, flags, target)
+    # the frames are reduced to the palettes of GIF by the workers, which is slower than the rendering otherwise.
+    return Image.fromarray(image).quantize(method=Image.Quantize.FASTOCTREE)
+
+
+def render_gif(
+    trace: str, game: int, path: str, n_jobs: int = 1, duration: int = 500, engine: str = "auto"
+) -> None:
+    """
+    Render a recorded game into a GIF with a frame after each move.
+
+    Args:
+        trace (str):
+            The path of the trace file.
+        game (int):
+            The index of the game in the trace file.
+        path (str):
+            The path of the GIF.
+        n_jobs (int):
+            The number of processes rendering the frames.
+        duration (int):
+            The duration of each frame in milliseconds.
+        engine (str):
+            The engine computing the probabilities shown in the frames.
+    """
+    reader = TraceReader(trace)
+    info = reader.info(game)
+    height, width = info["height"], info["width"]
+    frames = list(reader.frames(game))
+    if len(frames) == 0:
+        raise ValueError(f"game {game} of {trace} has no moves to render")
+
+    targets = compute_targets(frames, height, width, info["n_mines"], engine=engine)
+    args = [(height, width, cell_state, flags, target) for (cell_state, flags), target in zip(frames, targets)]
+    if n_jobs == 1:
+        images = list(map(_render_frame, args))
+    else:
+        # each process takes consecutive frames, which differ in a few cells.
+        with Pool(n_jobs) as pool:
+            images = pool.map(_render_frame, args, chunksize=-(-len(args) // n_jobs))
+
+    first, *others = images
+    first.save(path, save_all=True, append_images=others, duration=duration, loop=0)
+
+
+def visualize(
+    cell_state: np.ndarray, flags: np.ndarray, identifier: int | None = None, target: TargetData | None = None
+) -> None:
+    # matplotlib is only needed for the plots, so that it is not loaded by importing this module.
+    import matplotlib.pyplot as plt
 
-    for idx, prob in zip(target.index, target.proba):
-        y, x = idx // W, idx % W
-        ax.text(x + 0.5, H - y - 0.5, f"{int(prob*100)}", ha="center", va="center")
+    H, W, n_mines = SHAPES[cell_state.size]
+    if target is None:
+        target = compute_targets([(cell_state, flags)], H, W, n_mines, engine="python")[0]
 
-    ax.set_xlabel("NOTE: the numbers in cyan cells show the percentage of having a mine.", fontsize=16)
+    renderer = FrameRenderer(H, W)
+    renderer.draw(cell_state, flags, target)
     os.makedirs("demodata", exist_ok=True)
 
     if identifier is not None:
-        plt.savefig(f"demodata/demo{identifier:0>3}.png", bbox_inches="tight")
+        renderer.figure.savefig(f"demodata/demo{identifier:0>3}.png", bbox_inches="tight")
     else:
+        plt.imshow(renderer.render(cell_state, flags, target))
+        plt.axis("off")
         plt.show()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from src.batch import BatchMineSweeper, BatchPlayer
+from src.mine_sweeper import MineSweeper
+from src.player import Player
+
+
+def test_start():
+    seeds = list(range(10))
+    batch = BatchMineSweeper(seeds, difficulty=1)
+    batch.start(np.full(len(seeds), 136))
+    for i, seed in enumerate(seeds):
+        field = MineSweeper(difficulty=1, seed=seed, plot_field=False)
+        field.start(136)
+        assert np.array_equal(batch._field[i], field._field)
+        assert np.array_equal(batch.cell_state_view[i], field.cell_state)
+        assert batch.over[i] == field.over and batch.clear[i] == field.clear
+
+
+def test_batch_player():
+    for difficulty in [0, 1]:
+        seeds = list(range(30))
+        batch = BatchMineSweeper(seeds, difficulty=difficulty)
+        wins = BatchPlayer(batch).solve()
+        expected = [Player(MineSweeper(difficulty, seed=seed, plot_field=False)).solve() for seed in seeds]
+        assert wins.tolist() == expected
+        assert not np.any(batch.active)
+
+
+def test_batch_counts():
+    seeds = list(range(20))
+    batch = BatchPlayer(BatchMineSweeper(seeds, difficulty=1))
+    batch.solve()
+    for seed, n_moves, player in zip(seeds, batch.n_moves, batch.players):
+        expected = Player(MineSweeper(difficulty=1, seed=seed, plot_field=False))
+        expected.solve()
+        assert player.n_guesses == expected.n_guesses
+        assert n_moves == expected.n_moves
+        assert len(player.stats) == len(expected.stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
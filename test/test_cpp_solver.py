@@ -0,0 +1,72 @@
+import json
+import pytest
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.constants import Difficulties
+from src.mine_sweeper import MineSweeper
+from src.probability import ProbabilityCalculator
+
+mine_sweeper_solver = pytest.importorskip("mine_sweeper_solver")
+
+
+with open("benchmarkdata/states.json", "r") as f:
+    STATES = json.load(f)
+
+
+def _field(state: dict) -> MineSweeper:
+    return MineSweeper(state["difficulty"], seed=0, plot_field=False)
+
+
+def _solve(state: dict) -> np.ndarray:
+    field = _field(state)
+    cell_state = np.asarray(state["cell_state"]).reshape(field.height, field.width)
+    return mine_sweeper_solver.calculate_probability(cell_state, field.n_mines)
+
+
+@pytest.mark.parametrize("state", STATES, ids=[state["name"] for state in STATES])
+def test_benchmark_states(state: dict) -> None:
+    field = _field(state)
+    cell_state = np.asarray(state["cell_state"])
+    # the flags are the mines found by the player, which the C++ solver finds by itself.
+    flags = np.asarray(state["flags"], dtype=np.bool8)
+    ans, ans_p_land = ProbabilityCalculator(
+        cell_state=cell_state, flags=flags, neighbors=field.neighbors_view, n_mines=field.n_mines
+    ).compute()
+
+    probs = _solve(state).ravel()
+    assert np.allclose(probs[ans.index], ans.proba)
+    assert np.all(probs[flags] == 1.0)
+    is_land = (cell_state == -1) & ~flags
+    is_land[ans.index] = False
+    assert np.allclose(probs[is_land], ans_p_land)
+
+
+def test_strided_input() -> None:
+    cell_state = np.array([[-1, 1, 0], [-1, 1, 0], [-1, 1, 0]])
+    ans = mine_sweeper_solver.calculate_probability(cell_state, 1)
+    assert np.allclose(ans, [[0, 0, 0], [1, 0, 0], [0, 0, 0]])
+
+    # the solver reads the buffer through its strides without a copy to the C order.
+    padded = np.full((6, 6), 9)
+    padded[::2, 1::2] = cell_state
+    assert np.all(mine_sweeper_solver.calculate_probability(padded[::2, 1::2], 1) == ans)
+    assert np.all(mine_sweeper_solver.calculate_probability(np.asfortranarray(cell_state), 1) == ans)
+    assert np.all(mine_sweeper_solver.calculate_probability(cell_state[::-1, ::-1], 1) == ans[::-1, ::-1])
+
+
+def test_concurrent_calls() -> None:
+    # the solver releases the GIL, so that two threads search at once with the same results as one by one.
+    states = [state for state in STATES if state["difficulty"] == Difficulties.hard.value]
+    answers = list(map(_solve, states))
+    with ThreadPoolExecutor(2) as executor:
+        results = list(executor.map(_solve, states))
+
+    for result, ans in zip(results, answers):
+        assert np.all(result == ans)
+
+
+if __name__ == "__main__":
+    unittest.main()
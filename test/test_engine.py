@@ -0,0 +1,92 @@
+import pytest
+import unittest
+
+import numpy as np
+
+from src.engine import (
+    ENGINES,
+    SEARCH_MAX_COMPONENTS,
+    SEARCH_MAX_TARGETS,
+    SEARCH_MAX_TOTAL_TARGETS,
+    AutoProbabilityCalculator,
+    get_engine,
+    register_engine,
+    select_engine,
+)
+from src.mine_sweeper import MineSweeper
+from src.probability import ProbabilityCalculator, SearchBudgetExceeded
+
+
+def test_get_engine() -> None:
+    assert {"python", "dp", "auto"} <= set(ENGINES)
+    assert get_engine("python") is ProbabilityCalculator
+    with pytest.raises(ValueError):
+        get_engine("dummy")
+
+    register_engine("dummy", ProbabilityCalculator)
+    try:
+        assert get_engine("dummy") is ProbabilityCalculator
+    finally:
+        del ENGINES["dummy"]
+
+
+def test_select_engine() -> None:
+    fastest = "cpp" if "cpp" in ENGINES else "dp"
+    assert select_engine([]) == "python"
+    assert select_engine([1, 2, SEARCH_MAX_TARGETS]) == "python"
+    assert select_engine([1, SEARCH_MAX_TARGETS + 1]) == fastest
+    # many components go to the fastest engine even if each of them is small.
+    assert select_engine([SEARCH_MAX_TARGETS] * (SEARCH_MAX_TOTAL_TARGETS // SEARCH_MAX_TARGETS + 1)) == fastest
+    assert select_engine([1] * (SEARCH_MAX_COMPONENTS + 1)) == fastest
+    # the C++ solver cannot stop at the budgets.
+    assert select_engine([1, SEARCH_MAX_TARGETS + 1], budgeted=True) == "dp"
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_engines(engine: str) -> None:
+    # a row of 1s between two closed rows makes a component larger than SEARCH_MAX_TARGETS.
+    ms = MineSweeper(seed=0, plot_field=False, shape=(5, 30, 20))
+    cell_state = np.full(150, -1)
+    cell_state[30:60] = 1
+    cell_state[120] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    kwargs = dict(cell_state=cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines, width=30)
+
+    ans, ans_p_land = ProbabilityCalculator(**kwargs).compute()
+    prob = get_engine(engine)(**kwargs)
+    assert len(prob._components) == 2
+    target, p_land = prob.compute()
+    assert np.all(target.index == ans.index)
+    assert np.allclose(target.proba, ans.proba)
+    assert np.isclose(p_land, ans_p_land)
+
+
+def test_auto() -> None:
+    ms = MineSweeper(seed=0, plot_field=False, shape=(5, 30, 20))
+    cell_state = np.full(150, -1)
+    cell_state[[0, 149]] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    prob = AutoProbabilityCalculator(cell_state=cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=20)
+    target, _ = prob.compute()
+    # the small components are enumerated by the search.
+    assert prob.stats.n_leaves == 6
+    assert np.allclose(target.proba, 1 / 3)
+
+
+def test_auto_budget() -> None:
+    # the large component is enumerated by the dynamic programming within the budget even if the C++ solver is built.
+    ms = MineSweeper(seed=0, plot_field=False, shape=(5, 30, 20))
+    cell_state = np.full(150, -1)
+    cell_state[30:60] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    kwargs = dict(cell_state=cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines, width=30)
+    with pytest.raises(SearchBudgetExceeded):
+        AutoProbabilityCalculator(**kwargs, max_nodes=10).compute()
+
+    prob = AutoProbabilityCalculator(**kwargs, max_nodes=10**6)
+    prob.compute()
+    assert prob.stats.n_nodes > 0
+
+
+if __name__ == "__main__":
+    unittest.main()
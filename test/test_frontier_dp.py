@@ -0,0 +1,73 @@
+import pytest
+import unittest
+
+import numpy as np
+
+from src.frontier_dp import FrontierDPProbabilityCalculator
+from src.mine_sweeper import MineSweeper
+from src.probability import ProbabilityCalculator
+from src.topology import get_topology
+
+
+@pytest.mark.parametrize("ordering", ["index", "frontier", "constrained"])
+def test_frontier_dp(ordering: str) -> None:
+    ms = MineSweeper(difficulty=2, seed=0, plot_field=False, quiet=True)
+    ms.start(240)
+    flags = np.zeros(ms.height * ms.width, dtype=np.bool8)
+    kwargs = dict(cell_state=ms.cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines)
+
+    ans, ans_p_land = ProbabilityCalculator(**kwargs).compute()
+    prob = FrontierDPProbabilityCalculator(**kwargs, ordering=ordering)
+    target, p_land = prob.compute()
+    assert prob.stats.ordering == ordering
+    assert np.all(target.index == ans.index)
+    assert np.allclose(target.proba, ans.proba)
+    assert np.isclose(p_land, ans_p_land)
+
+
+def test_long_frontier() -> None:
+    # a row of 1s between two closed rows, where each constraint sees 6 targets of the chain.
+    # every third column has a mine either above or below the 1s, so that the search reaches 2 ** 10 leaves.
+    ms = MineSweeper(seed=0, plot_field=False, shape=(5, 30, 20))
+    cell_state = np.full(150, -1)
+    cell_state[30:60] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    kwargs = dict(cell_state=cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines)
+
+    prob = ProbabilityCalculator(**kwargs)
+    ans, ans_p_land = prob.compute()
+    assert prob.stats.n_leaves == 2**10
+
+    prob = FrontierDPProbabilityCalculator(**kwargs)
+    target, p_land = prob.compute()
+    assert np.all(target.index == ans.index)
+    assert np.allclose(target.proba, ans.proba)
+    assert np.isclose(p_land, ans_p_land)
+    # the sweep merges the assignments with the same needs of the open constraints.
+    assert prob.stats.n_nodes < 2**10
+
+
+def test_start_of_sweep() -> None:
+    # a row of 1s in the shape of a roof, whose first target in the index order is at the top in the middle.
+    height, width = 6, 13
+    cell_state = np.full(height * width, -1)
+    for x in range(width):
+        cell_state[(1 + abs(x - width // 2) // 3) * width + x] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    kwargs = dict(cell_state=cell_state, flags=flags, neighbors=get_topology(height, width).neighbors, n_mines=8)
+
+    ans, ans_p_land = ProbabilityCalculator(**kwargs).compute()
+    prob = FrontierDPProbabilityCalculator(**kwargs)
+    target, p_land = prob.compute()
+    assert np.all(target.index == ans.index)
+    assert np.allclose(target.proba, ans.proba)
+    assert np.isclose(p_land, ans_p_land)
+
+    # the sweep starts from one end of the roof instead of the middle.
+    members, constraints = prob._components[0]
+    start = target.index[members[prob._order(members, constraints)[0]]]
+    assert start % width in [0, 1, width - 2, width - 1]
+
+
+if __name__ == "__main__":
+    unittest.main()
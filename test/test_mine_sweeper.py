@@ -1,5 +1,7 @@
+import io
 import pytest
 import unittest
+from contextlib import redirect_stdout
 
 import numpy as np
 
@@ -23,6 +25,30 @@ class TestMineSweeper(unittest.TestCase):
                 field.start(0)
                 assert np.count_nonzero(field._field == -2) == field.n_mines
 
+    def test_custom_field(self) -> None:
+        field = MineSweeper(shape=(20, 50, 200), seed=0, plot_field=False)
+        assert field.height == 20 and field.width == 50 and field.n_mines == 200
+        field.start(0)
+        assert np.count_nonzero(field._field == -2) == 200
+
+        # a corner of 10 x 10 leaves 96 cells for the mines.
+        for shape in [(0, 10, 0), (10, 10, 97), (10, 10, -1)]:
+            with pytest.raises(ValueError):
+                MineSweeper(shape=shape)
+
+    def test_small_field(self) -> None:
+        # the neighborhoods of the first cells are smaller than 3 x 3.
+        for shape, idx in [((3, 3, 5), 0), ((1, 20, 18), 0), ((1, 20, 17), 10)]:
+            field = MineSweeper(shape=shape, seed=0, plot_field=False, quiet=True)
+            field.start(idx)
+            assert np.count_nonzero(field._field == -2) == shape[2]
+            assert field.cell_state[idx] != -1
+
+        # the center of 3 x 3 has 8 neighbors.
+        field = MineSweeper(shape=(3, 3, 5), seed=0, plot_field=False)
+        with pytest.raises(ValueError):
+            field.start(4)
+
     def test_loc2idx(self) -> None:
         field = MineSweeper(difficulty=2)
         for i in range(field.height * field.width):
@@ -67,6 +93,47 @@ class TestMineSweeper(unittest.TestCase):
         assert all(field._cell_state[indices] == 0)
         assert all(field._cell_state[i] != 0 for i in range(size) if i not in indices)
 
+    def test_start(self) -> None:
+        for seed in range(10):
+            field = MineSweeper(difficulty=1, seed=seed, plot_field=False)
+            field.start(0)
+            mines = field._field == -2
+            for idx in np.flatnonzero(~mines):
+                assert field._field[idx] == np.count_nonzero(mines[field.neighbors_view[idx]])
+
+            # the cells in a zero region share the label with their zero neighbors.
+            labels = field._label_zero_regions()
+            for idx in np.flatnonzero(field._field == 0):
+                neighbors = field.neighbors_view[idx]
+                assert np.all(labels[neighbors[field._field[neighbors] == 0]] == labels[idx])
+                assert labels[idx] <= idx
+            assert np.all(labels[field._field != 0] == field._field.size)
+
+    def test_views(self) -> None:
+        field = MineSweeper(difficulty=0, seed=0, plot_field=False)
+        view, neighbors = field.cell_state_view, field.neighbors_view
+        with pytest.raises(ValueError):
+            view[0] = 0
+        with pytest.raises(ValueError):
+            neighbors[0][0] = 0
+
+        field.start(40)
+        assert np.all(view == field.cell_state)
+        assert all(np.all(n == m) for n, m in zip(field.neighbors, neighbors))
+
+        copied = field.neighbors
+        copied[0][0] = -1
+        assert field.neighbors_view[0][0] != -1
+
+    def test_quiet(self) -> None:
+        # the quiet field prints neither the field nor the judge statement at the end of the game.
+        field = MineSweeper(difficulty=0, seed=0, quiet=True)
+        with redirect_stdout(io.StringIO()) as out:
+            field.start(40)
+            field.open_multiple(np.flatnonzero(field._field != -2))
+        assert field.clear
+        assert out.getvalue() == ""
+
 
 if __name__ == "__main__":
     unittest.main()
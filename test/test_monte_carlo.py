@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from src.mine_sweeper import MineSweeper
+from src.monte_carlo import MonteCarloProbabilityCalculator
+from src.probability import ProbabilityCalculator
+
+
+def test_monte_carlo() -> None:
+    ms = MineSweeper(difficulty=1)
+    cell_state = np.full(256, -1)
+    cell_state[[0, 1, 16, 17]] = [0, 1, 1, 2]
+    cell_state[255] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    kwargs = dict(cell_state=cell_state, flags=flags, neighbors=ms.neighbors, n_mines=ms.n_mines)
+
+    ans, ans_p_land = ProbabilityCalculator(**kwargs).compute()
+    prob = MonteCarloProbabilityCalculator(**kwargs, n_samples=2000, seed=0)
+    target, p_land = prob.compute()
+    stderr, p_land_stderr = prob.stderr
+    assert np.all(target.index == ans.index)
+    assert np.all(np.abs(target.proba - ans.proba) <= np.maximum(5 * stderr, 1e-12))
+    assert abs(p_land - ans_p_land) <= max(5 * p_land_stderr, 1e-12)
+    assert prob.stats.n_leaves > 0
+    assert prob.stats.ordering == "index"
+
+
+if __name__ == "__main__":
+    unittest.main()
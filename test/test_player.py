@@ -1,5 +1,8 @@
+import pytest
 import unittest
 
+import numpy as np
+
 from src.mine_sweeper import MineSweeper
 from src.player import Player
 
@@ -14,5 +17,71 @@ def test_player():
         Player(field).solve()
 
 
+def test_player_stats():
+    field = MineSweeper(difficulty=1, seed=8, plot_field=False)
+    player = Player(field)
+    player.solve()
+    assert len(player.stats) > 0
+    assert all(stats.n_nodes >= stats.n_leaves for stats in player.stats)
+    # each guess is a move after the first one.
+    assert player.n_guesses < player.n_moves <= np.count_nonzero(field.cell_state != -1)
+
+
+def test_player_with_budget():
+    stats = []
+    for i in range(3):
+        field = MineSweeper(difficulty=1, seed=i, plot_field=False)
+        player = Player(field, max_nodes=0, n_samples=100)
+        player.solve()
+        stats += player.stats
+
+    # every move is sampled and reports the order of its own assignments.
+    assert len(stats) > 0 and all(s.ordering == "index" for s in stats)
+
+
+def test_deterministic_moves():
+    field = MineSweeper(difficulty=0, plot_field=False)
+    player = Player(field)
+    table = player._neighbor_table
+    assert table.shape == (81, 8)
+    assert np.all(table[0, 3:] == 81)
+    assert set(table[0, :3]) == {1, 9, 10}
+
+    # the 1 at the cell 1 has the only closed neighbor at the cell 0.
+    field._field[:] = 1
+    field._field[0] = -2
+    field._cell_state[[1, 2, 9, 10, 11]] = [1, 0, 0, 1, 0]
+    player._build_flags()
+    assert np.arange(81)[player.flags].tolist() == [0]
+    assert player._open_safe_cells()
+    assert np.all(field.cell_state[[18, 19, 20]] == 1)
+    assert field.cell_state[0] == -1
+
+
+def test_presolve():
+    # 1-2 against the top wall: the 2 at the cell 10 needs the cell 2 that the 1 at the cell 9 does not see.
+    field = MineSweeper(difficulty=0, plot_field=False)
+    player = Player(field)
+    field._field[:] = 1
+    field._cell_state[[9, 10, 11, 18, 19, 20]] = [1, 2, 0, 0, 0, 0]
+    player._build_flags()
+    assert not player._open_safe_cells()
+    assert player.presolve()
+    assert np.arange(81)[player.flags].tolist() == [2]
+    assert not player.presolve()
+
+
+def test_engine():
+    for seed in range(3):
+        players = [Player(MineSweeper(difficulty=1, seed=seed, plot_field=False), engine=e) for e in ["python", "dp"]]
+        results = [player.solve() for player in players]
+        # both engines are exact, so that they make the same moves.
+        assert results[0] == results[1]
+        assert np.all(players[0]._field.cell_state == players[1]._field.cell_state)
+
+    with pytest.raises(ValueError):
+        Player(MineSweeper(difficulty=0, plot_field=False), engine="dummy")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from itertools import product
+
+import numpy as np
+
+from src.presolve import mask_to_indices, presolve
+
+
+def test_pair_rules():
+    # 1-2 against a wall: the 2 needs the cell that the 1 does not see.
+    assert presolve([0b011, 0b111], [1, 2]) == (0b100, 0)
+    # 1-1 against a wall: the second 1 is satisfied by the cells of the first one.
+    assert presolve([0b011, 0b111], [1, 1]) == (0, 0b100)
+    # two 1s sharing one cell decide nothing.
+    assert presolve([0b0011, 0b0110], [1, 1]) == (0, 0)
+    assert presolve([0b011, 0b111], [2, 1]) is None
+
+
+def test_brute_force():
+    rng = np.random.RandomState(0)
+    for _ in range(100):
+        n_cells, n_constraints = 8, rng.randint(1, 5)
+        answer = rng.randint(2, size=n_cells)
+        masks = [int(rng.randint(1, 1 << n_cells)) for _ in range(n_constraints)]
+        needs = [int(sum(answer[mask_to_indices(mask, n_cells)])) for mask in masks]
+        valid = [
+            bits
+            for bits in product([0, 1], repeat=n_cells)
+            if all(sum(np.asarray(bits)[mask_to_indices(mask, n_cells)]) == need for mask, need in zip(masks, needs))
+        ]
+        mine, safe = presolve(masks, needs)
+        for i in mask_to_indices(mine, n_cells):
+            assert all(bits[i] == 1 for bits in valid)
+        for i in mask_to_indices(safe, n_cells):
+            assert all(bits[i] == 0 for bits in valid)
+
+
+def test_mask_to_indices():
+    assert mask_to_indices(0, 10).tolist() == []
+    assert mask_to_indices((1 << 9) | 0b101, 10).tolist() == [0, 2, 9]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
+import inspect
+import pytest
+import sys
 import unittest
 
 import numpy as np
 
-from src.probability import ProbabilityCalculator
+from src.constants import SearchStats
+from src.probability import ProbabilityCalculator, SearchBudgetExceeded
 from src.mine_sweeper import MineSweeper
+from src.topology import get_topology
 
 
 """
@@ -40,7 +45,8 @@ The indices of B: [ 73 100 172 199 218]
 """
 
 
-def test_probability() -> None:
+@pytest.mark.parametrize("representation", ["array", "bitset"])
+def test_probability(representation: str) -> None:
     ms = MineSweeper(difficulty=1)
     cell_state = np.array(
         [
@@ -69,6 +75,7 @@ def test_probability() -> None:
         flags=flags,
         neighbors=ms.neighbors,
         n_mines=ms.n_mines,
+        representation=representation,
     )
 
     target = prob.compute()[0]
@@ -78,5 +85,164 @@ def test_probability() -> None:
     assert np.all(ans == target.index[target.proba == 1])
 
 
+def test_independent_components() -> None:
+    ms = MineSweeper(difficulty=0)
+    cell_state = np.full(81, -1)
+    cell_state[[0, 80]] = 1
+    prob = ProbabilityCalculator(
+        cell_state=cell_state,
+        flags=np.zeros_like(cell_state, dtype=np.bool8),
+        neighbors=ms.neighbors,
+        n_mines=ms.n_mines,
+    )
+
+    target, p_land = prob.compute()
+    assert len(prob._components) == 2
+    assert np.all(target.index == np.array([1, 9, 10, 70, 71, 79]))
+    assert np.allclose(target.proba, 1 / 3)
+    assert np.isclose(p_land, 8 / 73)
+
+
+def test_large_field() -> None:
+    # the binomials of the land cells are far beyond the float64 range.
+    ms = MineSweeper(seed=0, plot_field=False, shape=(200, 200, 8000), quiet=True)
+    ms.start(20100)
+    flags = np.zeros(ms.height * ms.width, dtype=np.bool8)
+    prob = ProbabilityCalculator(cell_state=ms.cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines)
+    target, p_land = prob.compute()
+    assert target.index.size > 0 and np.all(np.isfinite(target.proba))
+    assert 0.0 < p_land < 1.0
+
+    # the expected number of mines must match the number of mines in the field.
+    n_land_cells = np.count_nonzero(ms.cell_state == -1) - target.index.size
+    assert np.isclose(np.sum(target.proba) + p_land * n_land_cells, ms.n_mines)
+
+
+def test_long_component() -> None:
+    # a long strip of ones makes a deep search, which must run out of the budget instead of the stack.
+    cell_state = np.full(3 * 300, -1)
+    cell_state[300:600] = 1
+    prob = ProbabilityCalculator(
+        cell_state=cell_state,
+        flags=np.zeros_like(cell_state, dtype=np.bool8),
+        neighbors=get_topology(3, 300).neighbors,
+        n_mines=100,
+        representation="bitset",
+        max_nodes=200,
+    )
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + 50)
+    try:
+        with pytest.raises(SearchBudgetExceeded):
+            prob.compute()
+    finally:
+        sys.setrecursionlimit(limit)
+    # the time of the aborted search is kept for the fallback.
+    assert prob.stats.elapsed > 0.0
+
+
+def test_invalid_representation() -> None:
+    ms = MineSweeper(difficulty=0)
+    cell_state = np.full(81, -1)
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    with pytest.raises(ValueError):
+        ProbabilityCalculator(
+            cell_state=cell_state, flags=flags, neighbors=ms.neighbors, n_mines=ms.n_mines, representation="dummy"
+        )
+
+
+def test_stats() -> None:
+    ms = MineSweeper(difficulty=0)
+    cell_state = np.full(81, -1)
+    cell_state[[0, 80]] = 1
+    results = []
+    prob = ProbabilityCalculator(
+        cell_state=cell_state,
+        flags=np.zeros_like(cell_state, dtype=np.bool8),
+        neighbors=ms.neighbors,
+        n_mines=ms.n_mines,
+        callback=results.append,
+    )
+
+    prob.compute()
+    stats = prob.stats
+    assert results == [stats]
+    assert stats.n_components == 2
+    assert stats.n_leaves == 6  # each component has 3 ways to put one mine
+    assert stats.n_nodes >= stats.n_leaves
+    assert stats.n_backtracks >= stats.n_contradictions
+    assert stats.elapsed >= 0.0
+
+
+def test_update() -> None:
+    ms = MineSweeper(difficulty=0)
+    cell_state = np.full(81, -1)
+    cell_state[[0, 80]] = 1
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    prob = ProbabilityCalculator(cell_state=cell_state, flags=flags, neighbors=ms.neighbors, n_mines=ms.n_mines)
+    prob.compute()
+
+    cell_state = cell_state.copy()
+    cell_state[79] = 1
+    prob.update(cell_state=cell_state, flags=flags)
+    cached = prob._cached_counts[(1, 9, 10)]
+    target, p_land = prob.compute()
+    assert prob._cached_counts[(1, 9, 10)] is cached
+
+    ans, ans_p_land = ProbabilityCalculator(
+        cell_state=cell_state, flags=flags, neighbors=ms.neighbors, n_mines=ms.n_mines
+    ).compute()
+    assert np.all(target.index == ans.index)
+    assert np.allclose(target.proba, ans.proba)
+    assert np.isclose(p_land, ans_p_land)
+
+
+@pytest.mark.parametrize("representation", ["array", "bitset"])
+@pytest.mark.parametrize("ordering", ["frontier", "constrained"])
+def test_ordering(representation: str, ordering: str) -> None:
+    ms = MineSweeper(difficulty=2, seed=0, plot_field=False, quiet=True)
+    ms.start(240)
+    flags = np.zeros(ms.height * ms.width, dtype=np.bool8)
+    ans, ans_p_land = ProbabilityCalculator(
+        cell_state=ms.cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines, ordering="index"
+    ).compute()
+    prob = ProbabilityCalculator(
+        cell_state=ms.cell_state,
+        flags=flags,
+        neighbors=ms.neighbors_view,
+        n_mines=ms.n_mines,
+        representation=representation,
+        ordering=ordering,
+    )
+
+    # the order of the assignments only changes the search, not the counts.
+    target, p_land = prob.compute()
+    assert prob.stats.ordering == ordering
+    assert np.all(target.index == ans.index)
+    assert np.allclose(target.proba, ans.proba)
+    assert np.isclose(p_land, ans_p_land)
+
+
+def test_default_ordering() -> None:
+    ms = MineSweeper(difficulty=0)
+    cell_state = np.full(81, -1)
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    prob = ProbabilityCalculator(cell_state=cell_state, flags=flags, neighbors=ms.neighbors, n_mines=ms.n_mines)
+    # the stats report the ordering of the calculator before and after the computation.
+    assert SearchStats().ordering == prob.stats.ordering == "constrained"
+    prob.compute()
+    assert prob.stats.ordering == "constrained"
+
+
+def test_invalid_ordering() -> None:
+    ms = MineSweeper(difficulty=0)
+    cell_state = np.full(81, -1)
+    flags = np.zeros_like(cell_state, dtype=np.bool8)
+    with pytest.raises(ValueError):
+        ProbabilityCalculator(
+            cell_state=cell_state, flags=flags, neighbors=ms.neighbors, n_mines=ms.n_mines, ordering="dummy"
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.mine_sweeper import MineSweeper
+from src.probability import ProbabilityCalculator
+from src.service import ProbabilityService, serve_stream
+
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+
+def _request(seed: int) -> dict:
+    ms = MineSweeper(difficulty=1, seed=seed, plot_field=False, quiet=True)
+    ms.start(136)
+    return dict(id=seed, cell_state=ms.cell_state.reshape(ms.height, ms.width).tolist(), n_mines=ms.n_mines)
+
+
+def test_service() -> None:
+    service = ProbabilityService(engine="python")
+    for seed in range(3):
+        request = _request(seed)
+        response = service.compute(request)
+        ms = MineSweeper(difficulty=1)
+        cell_state = np.ravel(request["cell_state"])
+        ans, ans_p_land = ProbabilityCalculator(
+            cell_state=cell_state,
+            flags=np.zeros_like(cell_state, dtype=np.bool8),
+            neighbors=ms.neighbors,
+            n_mines=ms.n_mines,
+        ).compute()
+        assert response["id"] == seed
+        assert response["index"] == ans.index.tolist()
+        assert np.allclose(response["proba"], ans.proba)
+        assert np.isclose(response["p_land"], ans_p_land)
+
+    # the same board state is answered from the cache.
+    n_hits = service.cache.n_hits
+    service.compute(_request(0))
+    assert service.cache.n_hits > n_hits
+
+
+def test_closed_field() -> None:
+    # the mines are spread over the closed cells evenly before the first move.
+    response = ProbabilityService().compute(dict(cell_state=[[-1] * 3] * 3, n_mines=3))
+    assert response["index"] == [] and np.isclose(response["p_land"], 1 / 3)
+
+
+def test_invalid_request() -> None:
+    service = ProbabilityService()
+    request = _request(0)
+    assert "error" in service.compute(dict(id=0, n_mines=40))
+    assert "error" in service.compute(dict(request, cell_state=np.ravel(request["cell_state"]).tolist()))
+    assert "error" in service.compute(dict(request, cell_state=[[]]))
+    assert "error" in service.compute(dict(request, cell_state=[[-1, 9], [0, 1]]))
+    assert "error" in service.compute(dict(request, flags=[[0]]))
+    assert "error" in service.compute(dict(request, engine="dummy"))
+    assert "error" in service.compute(dict(request, n_mines=40.5))
+
+    cell_state = [[-1, 1, 0], [-1, 1, 0], [-1, 1, 0]]
+    assert "error" not in service.compute(dict(cell_state=cell_state, n_mines=1))
+    assert "error" in service.compute(dict(cell_state=cell_state, n_mines=-3))
+    assert "error" in service.compute(dict(cell_state=cell_state, n_mines=50))
+    assert "error" in service.compute(dict(cell_state=cell_state, n_mines=1, flags=[[0, 1, 0], [0, 0, 0], [0, 0, 0]]))
+    # the numbers and the mines without any valid configuration.
+    assert "error" in service.compute(dict(cell_state=cell_state, n_mines=3))
+    assert "error" in service.compute(dict(cell_state=[[-1, 3, 0], [-1, 1, 0], [-1, 1, 0]], n_mines=1))
+
+
+def test_serve_stream() -> None:
+    requests = [_request(seed) for seed in range(5)]
+    lines = [json.dumps(request) for request in requests] + ["dummy"]
+
+    async def run() -> bytes:
+        reader = asyncio.StreamReader()
+        reader.feed_data("\n".join(lines).encode() + b"\n")
+        reader.feed_eof()
+        writer = _Writer()
+        with ThreadPoolExecutor(2) as executor:
+            await serve_stream(reader, writer, executor, n_workers=2)
+        return writer.data
+
+    responses = [json.loads(line) for line in asyncio.run(run()).splitlines()]
+    assert len(responses) == len(lines)
+    errors = [response for response in responses if "error" in response]
+    assert len(errors) == 1 and errors[0]["id"] is None
+    # the responses may be out of order, but each of them has the id of its request.
+    service = ProbabilityService()
+    for response in responses:
+        if response["id"] is not None:
+            assert response == dict(service.compute(requests[response["id"]]), elapsed=response["elapsed"])
+
+
+def test_long_request() -> None:
+    lines = [json.dumps(_request(0)), json.dumps(dict(id=1, cell_state=[[-1, 1, 0]] * 3, n_mines=1)), "x" * 1000]
+
+    async def run() -> bytes:
+        # the first and the last lines are longer than the limit.
+        reader = asyncio.StreamReader(limit=256)
+        reader.feed_data("\n".join(lines).encode())
+        reader.feed_eof()
+        writer = _Writer()
+        with ThreadPoolExecutor(1) as executor:
+            await asyncio.wait_for(serve_stream(reader, writer, executor), timeout=10)
+        return writer.data
+
+    responses = [json.loads(line) for line in asyncio.run(run()).splitlines()]
+    assert len(responses) == 3
+    assert [response["id"] for response in responses if "error" not in response] == [1]
+
+
+def test_serve_file(tmp_path) -> None:
+    # stdin is a regular file instead of a pipe.
+    path = tmp_path / "requests.jsonl"
+    path.write_text("".join(json.dumps(_request(seed)) + "\n" for seed in range(2)))
+    with open(path) as f:
+        output = subprocess.run([sys.executable, "serve.py"], stdin=f, capture_output=True, timeout=60, check=True)
+
+    responses = [json.loads(line) for line in output.stdout.splitlines()]
+    assert sorted(response["id"] for response in responses if "error" not in response) == [0, 1]
+
+
+if __name__ == "__main__":
+    unittest.main()
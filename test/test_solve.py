@@ -0,0 +1,61 @@
+import json
+import signal
+import unittest
+
+from solve import GameResult, load_results, play, solve
+
+
+def _outcomes(results: list) -> list:
+    # the times differ from run to run, so only the outcomes of the games are compared.
+    return sorted((r.seed, r.result, r.moves, r.guesses) for r in results)
+
+
+def test_load_results(tmp_path) -> None:
+    path = tmp_path / "results.jsonl"
+    results = [GameResult(seed, "win", 3, 1, 0.1, 0.1, 0.2) for seed in range(2)]
+    # the last line is broken as if the run was killed while writing it.
+    path.write_text("".join(json.dumps(r._asdict()) + "\n" for r in results) + '{"seed": 2, "res')
+    assert load_results(str(path)) == results
+
+
+def test_resume(tmp_path) -> None:
+    path = str(tmp_path / "results.jsonl")
+    solve(seed=0, n_games=4, difficulty=0, engine="python", results=path)
+    expected = load_results(path)
+
+    path = str(tmp_path / "resumed.jsonl")
+    solve(seed=0, n_games=2, difficulty=0, engine="python", results=path)
+    with open(path, "a") as f:
+        f.write('{"seed": 2, "res')
+    # the seeds in the file are skipped and the broken line is kept apart from the new games.
+    solve(seed=0, n_games=4, difficulty=0, engine="python", results=path, resume=True)
+    resumed = load_results(path)
+    assert [r.seed for r in resumed] == [0, 1, 2, 3]
+    assert _outcomes(resumed) == _outcomes(expected)
+
+
+def test_jobs(tmp_path) -> None:
+    serial, parallel = str(tmp_path / "serial.jsonl"), str(tmp_path / "parallel.jsonl")
+    solve(seed=0, n_games=6, difficulty=0, engine="python", results=serial)
+    solve(seed=0, n_games=6, difficulty=0, engine="python", n_jobs=2, results=parallel)
+    assert _outcomes(load_results(parallel)) == _outcomes(load_results(serial))
+
+    # the last batch takes the remainder of the seeds.
+    batched = str(tmp_path / "batched.jsonl")
+    solve(seed=0, n_games=6, difficulty=0, engine="python", batch_size=4, results=batched)
+    assert _outcomes(load_results(batched)) == _outcomes(load_results(serial))
+
+
+def test_game_timeout() -> None:
+    result = play(seed=0, difficulty=2, engine="python", plot_field=False, game_timeout=1e-6)
+    assert result.result == "timeout"
+    # the alarm is cancelled, so that it does not hit the next game.
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    result = play(seed=0, difficulty=0, engine="python", plot_field=False, game_timeout=60.0)
+    assert result.result in ["win", "lose"]
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
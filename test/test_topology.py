@@ -0,0 +1,45 @@
+import pytest
+import unittest
+
+import numpy as np
+
+from src.mine_sweeper import MineSweeper
+from src.topology import TOPOLOGY_CACHE_SIZE, get_topology
+
+
+def test_topology():
+    for difficulty in [0, 1, 2]:
+        field = MineSweeper(difficulty=difficulty, plot_field=False)
+        topology = get_topology(field.height, field.width)
+        assert field.topology is topology
+        assert MineSweeper(difficulty=difficulty, plot_field=False).neighbors_view is topology.neighbors
+        for idx in range(topology.n_cells):
+            y, x = field.idx2loc(idx)
+            expected = [
+                field.loc2idx(y + dy, x + dx)
+                for dy in [-1, 0, 1]
+                for dx in [-1, 0, 1]
+                if (dy, dx) != (0, 0) and 0 <= y + dy < field.height and 0 <= x + dx < field.width
+            ]
+            assert topology.neighbors[idx].tolist() == expected
+            assert topology.table[idx].tolist() == expected + [topology.n_cells] * (8 - len(expected))
+
+
+def test_read_only():
+    topology = get_topology(9, 9)
+    with pytest.raises(ValueError):
+        topology.neighbors[0][0] = 0
+    with pytest.raises(ValueError):
+        topology.table[0, 0] = 0
+
+    assert np.all(topology.table[0, 3:] == 81)
+
+
+def test_cache_size():
+    for width in range(1, TOPOLOGY_CACHE_SIZE + 10):
+        get_topology(2, width)
+    assert get_topology.cache_info().currsize == TOPOLOGY_CACHE_SIZE
+
+
+if __name__ == "__main__":
+    unittest.main()
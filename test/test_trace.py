@@ -0,0 +1,99 @@
+import pytest
+import unittest
+
+import numpy as np
+
+from src.mine_sweeper import MineSweeper
+from src.player import Player
+from src.trace import RecordKinds, TraceReader, TraceRecorder
+
+
+def test_trace(tmp_path) -> None:
+    path = str(tmp_path / "games.trace")
+    results = []
+    with TraceRecorder(path) as recorder:
+        for seed in range(3):
+            field = MineSweeper(difficulty=1, seed=seed, plot_field=False)
+            player = Player(field, recorder=recorder)
+            clear = player.solve()
+            results.append((seed, clear, field.cell_state, player.flags))
+
+    # the records are appended to the existing file.
+    with TraceRecorder(path) as recorder:
+        field = MineSweeper(difficulty=0, seed=3, plot_field=False)
+        player = Player(field, recorder=recorder)
+        clear = player.solve()
+        results.append((3, clear, field.cell_state, player.flags))
+
+    reader = TraceReader(path)
+    assert len(reader) == 4
+    for game, (seed, clear, cell_state, flags) in enumerate(results):
+        info = reader.info(game)
+        assert info["seed"] == seed and info["clear"] == clear
+        assert info["height"] * info["width"] == cell_state.size
+        replayed_state, replayed_flags = reader.replay(game)
+        assert np.array_equal(replayed_state, cell_state)
+        assert np.array_equal(replayed_flags, flags)
+
+    moves = reader.moves(0)
+    opens = moves[moves["kind"] == RecordKinds.open]
+    assert np.all(opens["proba"][opens["value"] == 0] == 0.0)
+    assert np.all((reader.games >= 0) & (reader.games < 4))
+
+
+def test_replay_prefix(tmp_path) -> None:
+    path = str(tmp_path / "games.trace")
+    with TraceRecorder(path) as recorder:
+        Player(MineSweeper(difficulty=1, seed=0, plot_field=False), recorder=recorder).solve()
+
+    # the prefix of the game has the given number of moves, not of records.
+    reader = TraceReader(path)
+    frames = list(reader.frames(0))
+    for n_moves in [1, 3, len(frames) // 2, len(frames)]:
+        cell_state, flags = reader.replay(0, n_moves)
+        assert np.array_equal(cell_state, frames[n_moves - 1][0])
+        assert np.array_equal(flags, frames[n_moves - 1][1])
+
+    cell_state, flags = reader.replay(0, 0)
+    assert np.all(cell_state == -1) and not np.any(flags)
+
+
+def test_frames(tmp_path) -> None:
+    path = str(tmp_path / "games.trace")
+    with TraceRecorder(path) as recorder:
+        field = MineSweeper(difficulty=1, seed=0, plot_field=False)
+        player = Player(field, recorder=recorder)
+        player.solve()
+
+    reader = TraceReader(path)
+    frames = list(reader.frames(0))
+    # each move opens at least one cell.
+    assert len(frames) == player.n_moves
+    n_opened = [np.count_nonzero(cell_state != -1) for cell_state, _ in frames]
+    assert all(n < m for n, m in zip(n_opened, n_opened[1:]))
+    assert np.array_equal(frames[-1][0], field.cell_state)
+    assert np.array_equal(frames[-1][1], player.flags)
+
+
+def test_seed_range(tmp_path) -> None:
+    with TraceRecorder(str(tmp_path / "games.trace")) as recorder:
+        recorder.begin(9, 9, 10, 2**31 - 1)
+        # the seed would wrap around in the 32-bit field.
+        with pytest.raises(ValueError):
+            recorder.begin(9, 9, 10, 2**31)
+        with pytest.raises(ValueError):
+            recorder.begin(9, 9, 10, -2)
+
+
+def test_not_trace_file(tmp_path) -> None:
+    path = tmp_path / "dummy.trace"
+    path.write_bytes(b"dummy")
+    with pytest.raises(ValueError):
+        TraceReader(str(path))
+    # the records are not appended to the other files.
+    with pytest.raises(ValueError):
+        TraceRecorder(str(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
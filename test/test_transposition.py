@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from src.constants import ComponentCounts
+from src.mine_sweeper import MineSweeper
+from src.probability import ProbabilityCalculator
+from src.transposition import SYMMETRIES, TranspositionCache, canonicalize
+
+
+def test_canonicalize():
+    locs = np.array([[0, 0], [0, 1], [0, 2], [1, 0], [1, 1], [1, 2], [2, 3]])
+    values = np.array([-1, -1, -1, 1, 2, 1, 3])
+    signature, order = canonicalize(locs, values)
+    for symmetry in SYMMETRIES:
+        perm = np.random.RandomState(0).permutation(len(locs))
+        moved = locs[perm] @ symmetry + np.array([5, 7])
+        moved_signature, moved_order = canonicalize(moved, values[perm])
+        assert moved_signature == signature
+        assert np.array_equal(values[perm][moved_order], values[order])
+
+    assert canonicalize(locs, values[::-1])[0] != signature
+
+
+def test_lru():
+    cache = TranspositionCache(maxsize=2)
+    counts = ComponentCounts(n_configs=np.ones(2), mine_counts=np.ones((2, 1)))
+    cache.put(b"a", counts)
+    cache.put(b"b", counts)
+    assert cache.get(b"a") is counts
+    cache.put(b"c", counts)
+    assert len(cache) == 2
+    assert cache.get(b"b") is None and cache.get(b"a") is counts
+    assert cache.n_hits == 2 and cache.n_misses == 1
+
+
+def test_cache_hit():
+    # the same 1-2-1 wall at the top and rotated at the left edge.
+    ms = MineSweeper(difficulty=1, plot_field=False)
+    top = np.full(256, -1)
+    top[[16 + 5, 16 + 6, 16 + 7]] = [1, 2, 1]
+    top[[32 + 4, 32 + 5, 32 + 6, 32 + 7, 32 + 8]] = 1
+    left = top.reshape(16, 16).T.ravel()
+
+    cache = TranspositionCache()
+    for i, cell_state in enumerate([top, left]):
+        flags = np.zeros(256, dtype=np.bool8)
+        args = dict(cell_state=cell_state, flags=flags, neighbors=ms.neighbors_view, n_mines=ms.n_mines)
+        expected, p_land = ProbabilityCalculator(**args).compute()
+        expected = expected.proba.copy()
+        prob = ProbabilityCalculator(**args, cache=cache, width=ms.width)
+        target, cached_p_land = prob.compute()
+        assert np.array_equal(target.proba, expected) and cached_p_land == p_land
+        assert prob.stats.n_cached == i
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,15 @@
 import os
+import pytest
+import subprocess
+import sys
 import unittest
 
 import numpy as np
 
-from src.visualizer import visualize
+from src.mine_sweeper import MineSweeper
+from src.player import Player
+from src.trace import TraceReader, TraceRecorder
+from src.visualizer import FrameRenderer, compute_targets, render_gif, visualize
 
 
 def test_visualize():
@@ -33,5 +39,51 @@ def test_visualize():
     os.remove("demodata/demo999.png")
 
 
+def test_frame_renderer(tmp_path):
+    path = str(tmp_path / "games.trace")
+    with TraceRecorder(path) as recorder:
+        Player(MineSweeper(difficulty=0, seed=4, plot_field=False), recorder=recorder).solve()
+
+    frames = list(TraceReader(path).frames(0))
+    targets = compute_targets(frames, 9, 9, 10)
+    renderer = FrameRenderer(9, 9)
+    images = [renderer.render(cell_state, flags, target) for (cell_state, flags), target in zip(frames, targets)]
+    # the frames updated cell by cell are the same as the figure drawn as a whole.
+    for (cell_state, flags), target, image in zip(frames, targets, images):
+        expected = FrameRenderer(9, 9)
+        expected.draw(cell_state, flags, target)
+        expected.figure.canvas.draw()
+        full = np.asarray(expected.figure.canvas.buffer_rgba())[expected._crop][..., :3]
+        assert image.shape == full.shape
+        assert np.max(np.abs(image.astype(int) - full)) <= 1
+
+
+def test_render_gif(tmp_path):
+    from PIL import Image
+
+    path = str(tmp_path / "games.trace")
+    with TraceRecorder(path) as recorder:
+        Player(MineSweeper(difficulty=0, seed=4, plot_field=False), recorder=recorder).solve()
+
+    gif = str(tmp_path / "game.gif")
+    render_gif(path, 0, gif, n_jobs=2)
+    assert Image.open(gif).n_frames == len(list(TraceReader(path).frames(0)))
+
+    # a game without any move has no frame to render.
+    with TraceRecorder(path) as recorder:
+        recorder.begin(9, 9, 10, 0)
+        recorder.end(False, 0.0)
+    with pytest.raises(ValueError):
+        render_gif(path, 1, gif)
+
+
+def test_lazy_imports():
+    # the optional modules are not loaded until they are used.
+    code = "import sys, solve, src.visualizer; print(sorted({'matplotlib', 'mine_sweeper_solver'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
 if __name__ == "__main__":
     unittest.main()